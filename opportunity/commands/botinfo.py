@@ -16,7 +16,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils import Color
+from utils import Color, format_ms
 
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
@@ -53,9 +53,37 @@ class Botinfo(commands.Cog):
             color=Color.GREEN)
         for stat in stats.keys():
             em_msg.add_field(name=stat, value=stats[stat])
+        em_msg.add_field(name="Commands (p95 of the busiest)",
+                         value="\n".join(self.command_stats())[:1024] or "-",
+                         inline=False)
         em_msg.set_footer(text="Made by Maschs#6651")
 
         await interaction.followup.send(embed=em_msg)
 
+    def command_stats(self, top: int = 8) -> List[str]:
+        metrics = self.bot.metrics
+        phases = {phase: metrics.histograms(f"command_{phase}_seconds")
+                  for phase in ("defer", "upstream", "render")}
+        outcomes = metrics.counters("command_invocations_total")
+        missed = metrics.counters("command_deadline_missed_total")
+        lines = []
+        for labels, hist in sorted(
+                metrics.histograms("command_duration_seconds").items(),
+                key=lambda item: -item[1].count)[:top]:
+            label = dict(labels)
+            name = label["command"] + \
+                (" (autocomplete)" if label["kind"] == "autocomplete" else "")
+            split = ", ".join(f"{phase} {format_ms(h.quantile(0.95))}"
+                              for phase, family in phases.items()
+                              if (h := family.get(labels)))
+            errors = outcomes.get(tuple(sorted(labels + (("outcome",
+                                                          "error"),))))
+            late = missed.get(labels)
+            lines.append(f"{name}: n={hist.count} " +
+                         f"{format_ms(hist.quantile(0.95))} ({split}), " +
+                         f"errors {int(errors.value) if errors else 0}, " +
+                         f"late {int(late.value) if late else 0}")
+        return lines
+
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(Botinfo(bot))
@@ -15,7 +15,6 @@ from discord import app_commands
 from discord.ext import commands
 
 from utils import Color
-from components.views import Listings
 
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
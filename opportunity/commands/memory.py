@@ -0,0 +1,156 @@
+import logging
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Literal
+)
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import Color
+from commands.extensions import check_isme
+from components.profiler import statistic
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+def _size(size: float) -> str:
+    for unit in ["B", "kB", "MB"]:
+        if abs(size) < 1024:
+            return f"{round(size, 1)} {unit}"
+        size /= 1024
+    return f"{round(size, 1)} GB"
+
+def _field(lines: List[str]) -> str:
+    value = "\n".join(lines) or "-"
+    if len(value) > 1016:
+        value = value[:1012] + "\n..."
+    return f"```\n{value}```"
+
+class Memory(commands.Cog):
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+
+    def census_embed(self, census: Dict[str, Any], amount: int) -> \
+            discord.Embed:
+        em_msg = discord.Embed(
+            title="Memory census",
+            color=Color.GREEN)
+        overview = [f"RSS: {_size(census['rss'])}",
+                    f"gc objects: {census['gc objects']} " +
+                    f"(generations {census['gc counts']})",
+                    f"Views: {census['views']} with " +
+                    f"{census['view items']} items, " +
+                    f"{census['persistent views']} persistent"]
+        if "traced" in census:
+            current, peak = census["traced"]
+            overview.append(f"Traced: {_size(current)} " +
+                            f"(peak {_size(peak)})")
+        if "requests cache" in census:
+            entries, size = census["requests cache"]
+            overview.append(f"Requests cache: {entries} responses, " +
+                            f"{_size(size)} on disk")
+        em_msg.description = "\n".join(overview)
+        caches = sorted(census["caches"].items(), key=lambda c: -c[1][1])
+        em_msg.add_field(
+            name="Largest caches",
+            value=_field([f"{_size(size):>9} {length:>6} {name}"
+                          for name, (length, size) in caches[:amount]]),
+            inline=False)
+        cogs = sorted(census["cogs"].items(), key=lambda c: -c[1])
+        em_msg.add_field(
+            name="Largest cogs",
+            value=_field([f"{_size(size):>9} {name}"
+                          for name, size in cogs[:amount]]),
+            inline=False)
+        return em_msg
+
+    @app_commands.command(description="Show memory diagnostics")
+    @app_commands.describe(
+        action="census: views, cogs and caches, snapshot: top " +
+               "allocators, diff: growth since the last snapshot, " +
+               "sample: write a census to a file periodically",
+        amount="Number of entries per list",
+        minutes="Minutes between samples, 0 stops sampling")
+    @app_commands.check(check_isme)
+    async def memory(
+            self,
+            interaction: discord.Interaction,
+            action: Literal["census", "snapshot", "diff", "sample"],
+            amount: app_commands.Range[int, 1, 25] = 10,
+            minutes: app_commands.Range[int, 0, 1440] = 0
+    ) -> None:
+        await interaction.response.defer()
+        profiler = self.bot.memory
+        if action == "census":
+            em_msg = self.census_embed(profiler.census(), amount)
+        elif action == "sample":
+            profiler.stop_sampling()
+            em_msg = discord.Embed(
+                title="Memory sampling",
+                description="Stopped sampling",
+                color=Color.GREEN)
+            if minutes:
+                profiler.start_sampling(minutes)
+                em_msg.description = f"Sampling every {minutes} minutes " + \
+                                     f"to `{profiler.path}`"
+        elif profiler.snapshot() is None:
+            em_msg = discord.Embed(
+                title="Memory snapshot",
+                description="Started tracemalloc, allocations from now " +
+                            "on are traced. Take a snapshot again later.",
+                color=Color.GREEN)
+        elif action == "snapshot":
+            lines = []
+            for stat in profiler.top(amount):
+                location, size, count = statistic(stat)
+                lines.append(f"{_size(size):>9} {count:>7} {location}")
+            em_msg = discord.Embed(
+                title="Top allocators",
+                description=_field(lines),
+                color=Color.GREEN)
+        else:
+            lines = []
+            for diff in profiler.diff(amount):
+                location, _, _ = statistic(diff)
+                lines.append(f"{'+' if diff.size_diff >= 0 else '-'}" +
+                             f"{_size(abs(diff.size_diff)):>9} " +
+                             f"{diff.count_diff:>+7} {location}")
+            em_msg = discord.Embed(
+                title="Growth since the last snapshot",
+                description=_field(lines),
+                color=Color.GREEN)
+            if len(profiler.snapshots) < 2:
+                em_msg.description = "Only one snapshot yet, run diff " + \
+                                     "again later"
+        await interaction.followup.send(embed=em_msg)
+
+    @memory.error
+    async def memory_error(
+        self,
+        interaction: discord.Interaction,
+        error: app_commands.errors.AppCommandError
+    ) -> None:
+        em_msg = discord.Embed(
+            title="Error",
+            color=Color.RED)
+        if isinstance(error, app_commands.errors.CheckFailure):
+            em_msg.description = "Error: Command can only be " + \
+                                 "invoked by <@227087936464748545>"
+        else:
+            em_msg.description = str(error)
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=em_msg)
+        else:
+            await interaction.response.send_message(embed=em_msg)
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Memory(bot))
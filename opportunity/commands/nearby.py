@@ -0,0 +1,90 @@
+import contextvars
+import logging
+import time
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Optional
+)
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import Color, land_coords
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+    from components.cogs.plot_index import PlotIndex
+
+class Nearby(commands.Cog):
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+
+    @property
+    def plot_index(self) -> "PlotIndex":
+        return self.bot.get_cog("PlotIndex")  # type: ignore
+
+    @app_commands.command(description="List the plots for sale closest " +
+                                      "to a coordinate or plot")
+    @app_commands.describe(
+        latitude="Latitude in degrees",
+        longitude="Longitude in degrees",
+        plot="Asset id of a plot to search around",
+        amount="Number of listings to show")
+    async def nearby(
+            self,
+            interaction: discord.Interaction,
+            latitude: Optional[app_commands.Range[float, -90, 90]] = None,
+            longitude: Optional[app_commands.Range[float, -180, 180]] = None,
+            plot: Optional[str] = None,
+            amount: app_commands.Range[int, 1, 25] = 5
+    ) -> None:
+        await interaction.response.defer()
+        if plot is not None:
+            asset = None
+            if plot.isdigit():
+                # the request blocks, run it in the command's context so
+                # it is attributed to its timing and trace
+                context = contextvars.copy_context()
+                asset = await self.bot.loop.run_in_executor(
+                    None, context.run, self.bot.api.get_asset, plot)
+            if not asset or not (coords := land_coords(asset)):
+                await interaction.followup.send(embed=discord.Embed(
+                    title="Error",
+                    description=f"No plot with asset id **{plot}**",
+                    color=Color.RED))
+                return
+            latitude, longitude = coords
+        if latitude is None or longitude is None:
+            await interaction.followup.send(embed=discord.Embed(
+                title="Error",
+                description="Give either a latitude and longitude or a plot",
+                color=Color.RED))
+            return
+        if not len(self.plot_index.index):
+            await interaction.followup.send(embed=discord.Embed(
+                title="Error",
+                description="The plot index is still loading, " +
+                            "try again in a few minutes",
+                color=Color.RED))
+            return
+        start = time.perf_counter()
+        found = self.plot_index.nearest(latitude, longitude, amount)
+        elapsed = (time.perf_counter() - start) * 1000
+        em_msg = discord.Embed(
+            title=f"Plots for sale near {latitude:.4f}, {longitude:.4f}",
+            description="\n".join(
+                f"[{lis['name']}]({lis['link']}) " +
+                f"{lis['price']} {lis['token_symbol']} - {distance:.1f} km"
+                for distance, lis in found) or "No plots for sale",
+            color=Color.GREEN)
+        em_msg.set_footer(text=f"{len(self.plot_index.index)} plots " +
+                               f"indexed, searched in {elapsed:.1f} ms")
+        await interaction.followup.send(embed=em_msg)
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Nearby(bot))
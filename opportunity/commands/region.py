@@ -0,0 +1,135 @@
+import logging
+import sqlite3
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    List
+)
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import Color
+from components.regions import Region
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+    from components.cogs.region_watch import RegionWatch
+
+class Regions(commands.Cog):
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+
+    @property
+    def watch(self) -> "RegionWatch":
+        return self.bot.get_cog("RegionWatch")  # type: ignore
+
+    async def region_ac(
+        self,
+        interaction: discord.Interaction,
+        current: str,
+    ) -> List[app_commands.Choice[str]]:
+        choices = [region.name for region in
+                   self.watch.index.guild_regions(interaction.guild_id or 0)]
+        return [
+            app_commands.Choice(name=region, value=region)
+            for region in choices if current.lower() in region.lower()
+        ][:25]
+
+    @app_commands.command(description="Watch a region for plots " +
+                                      "below a price threshold")
+    @app_commands.describe(
+        points="Two corners 'lat,lon;lat,lon' or polygon points " +
+               "'lat,lon;lat,lon;lat,lon;...'")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def addregion(
+            self,
+            interaction: discord.Interaction,
+            name: str,
+            quadrangle: str,
+            points: str,
+            threshold: int,
+            channel: Optional[discord.TextChannel] = None
+    ) -> None:
+        try:
+            polygon = Region.parse_points(points)
+        except ValueError:
+            await interaction.response.send_message(embed=discord.Embed(
+                title="Error",
+                description="Points must be given as 'lat,lon;lat,lon' " +
+                            "(box) or at least three 'lat,lon' pairs, " +
+                            "with latitudes from -90 to 90 and " +
+                            "longitudes from -180 to 180",
+                color=Color.RED))
+            return
+        try:
+            region = self.watch.add_region(
+                interaction.guild_id or 0,
+                channel.id if channel else interaction.channel_id or 0,
+                name, quadrangle, polygon, threshold)
+        except ValueError as e:
+            await interaction.response.send_message(embed=discord.Embed(
+                title="Error",
+                description=str(e),
+                color=Color.RED))
+            return
+        except sqlite3.IntegrityError:
+            await interaction.response.send_message(embed=discord.Embed(
+                title="Error",
+                description=f"A region named **{name}** already exists",
+                color=Color.RED))
+            return
+        self.logger.info(f"Added region {name} on {quadrangle}")
+        await interaction.response.send_message(embed=discord.Embed(
+            title="Regions",
+            description=f"Watching **{region.name}** on " +
+                        f"**{region.quadrangle}** for plots up to " +
+                        f"**{region.threshold}** in <#{region.channel_id}>",
+            color=Color.GREEN))
+
+    @app_commands.command(description="Stop watching a region")
+    @app_commands.autocomplete(name=region_ac)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def delregion(
+            self,
+            interaction: discord.Interaction,
+            name: str
+    ) -> None:
+        if self.watch.remove_region(interaction.guild_id or 0, name):
+            em_msg = discord.Embed(
+                title="Regions",
+                description=f"Successfully removed region **{name}**",
+                color=Color.GREEN)
+        else:
+            em_msg = discord.Embed(
+                title="Error",
+                description=f"No region named **{name}**",
+                color=Color.RED)
+        await interaction.response.send_message(embed=em_msg)
+
+    @app_commands.command(description="List the watched regions")
+    @app_commands.guild_only()
+    async def regions(
+            self,
+            interaction: discord.Interaction
+    ) -> None:
+        regions = self.watch.index.guild_regions(interaction.guild_id or 0)
+        em_msg = discord.Embed(title="Regions", color=Color.GREEN)
+        em_msg.add_field(name="Name", value="\n".join(
+            [region.name for region in regions] if regions else ["-"]))
+        em_msg.add_field(name="Quadrangle", value="\n".join(
+            [region.quadrangle for region in regions] if regions else ["-"]))
+        em_msg.add_field(name="Threshold", value="\n".join(
+            [str(region.threshold) for region in regions]
+            if regions else ["-"]))
+        await interaction.response.send_message(embed=em_msg)
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Regions(bot))
@@ -1,5 +1,6 @@
 import logging
 import string
+import math
 
 # Annotation imports
 from typing import (
@@ -13,12 +14,22 @@ from discord import app_commands
 from discord.ext import commands
 
 from apscheduler.job import Job
+from apscheduler.triggers.interval import IntervalTrigger
 
-from utils import Color
+from utils import Color, task_label
 
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
 
+def _cycles_left(job: Job) -> str:
+    ''' Return the number of remaining runs of a reminder job '''
+    if not isinstance(job.trigger, IntervalTrigger):
+        return "1"
+    if not job.trigger.end_date:
+        return "\u221e"
+    left = (job.trigger.end_date - job.next_run_time).total_seconds()
+    return str(math.floor(left / job.trigger.interval_length) + 1)
+
 class Reminder(commands.Cog):
 
     def __init__(self, bot) -> None:
@@ -47,7 +58,7 @@ class Reminder(commands.Cog):
                     choices = []
         return [
             app_commands.Choice(
-                name=f"{job.kwargs['task_name']} ({job.id})", value=job.id)
+                name=f"{task_label(job.kwargs)} ({job.id})", value=job.id)
             for job in choices
             if current.lower() in job.kwargs["task_name"].lower()
         ]
@@ -90,8 +101,11 @@ class Reminder(commands.Cog):
             title=f"Reminders for {interaction.user.display_name}",
             color=Color.GREEN)
 
-        task_names = "\n".join([job.kwargs["task_name"] for job in jobs]
-                               if jobs else ["-"])
+        task_names = "\n".join([
+            f"{task_label(job.kwargs)} ({_cycles_left(job)}x)"
+            if isinstance(job.trigger, IntervalTrigger)
+            else task_label(job.kwargs) for job in jobs]
+            if jobs else ["-"])
         em_msg.add_field(name=f"Task", value=task_names)
 
         remind_time = "\n".join([
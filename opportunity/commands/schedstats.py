@@ -0,0 +1,130 @@
+import logging
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List
+)
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import Color, format_ms
+from commands.extensions import check_isme
+from components.metrics import Histogram, Labels
+from components.tracing import Trace
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+def _histogram_lines(histograms: Dict[Labels, Histogram]) -> List[str]:
+    lines = []
+    for labels, hist in sorted(histograms.items(),
+                               key=lambda item: -item[1].count):
+        name = ", ".join(value for _, value in labels)
+        lines.append(f"{name}: n={hist.count} " +
+                     f"p50={format_ms(hist.quantile(0.5))} " +
+                     f"p95={format_ms(hist.quantile(0.95))} " +
+                     f"max={format_ms(hist.max)}")
+    return lines
+
+def _waterfall(trace: Trace, width: int = 16) -> str:
+    ''' One line per span, bars placed on the trace's time axis '''
+    scale = width / trace.duration if trace.duration else 0.0
+    lines = []
+    for span in trace.spans:
+        offset = min(int(span.start * scale), width - 1)
+        length = max(min(round(span.duration * scale), width - offset), 1)
+        bar = " " * offset + "#" * length + " " * (width - offset - length)
+        lines.append(f"|{bar}| {format_ms(span.duration):>9} " +
+                     f"{span.status or span.error} {span.cache} " +
+                     f"{span.size // 1024} kB {span.endpoint}")
+    return "\n".join(lines) or "no upstream requests"
+
+class SchedStats(commands.Cog):
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+
+    @app_commands.command(description="Show scheduler latency statistics")
+    @app_commands.check(check_isme)
+    async def schedstats(
+            self,
+            interaction: discord.Interaction,
+    ) -> None:
+        metrics = self.bot.metrics
+        em_msg = discord.Embed(
+            title="Scheduler statistics",
+            color=Color.GREEN)
+        for title, name in [("Lag", "scheduler_job_lag_seconds"),
+                            ("Execution time",
+                             "scheduler_job_duration_seconds"),
+                            ("Misfire lateness",
+                             "scheduler_job_misfire_seconds"),
+                            ("Job store queries",
+                             "scheduler_jobstore_query_seconds"),
+                            ("Event loop stalls", "loop_stall_seconds")]:
+            lines = _histogram_lines(metrics.histograms(name))
+            em_msg.add_field(name=title,
+                             value="\n".join(lines)[:1024] or "-",
+                             inline=False)
+        counts = []
+        for title, name in [("Misfires", "scheduler_job_misfires_total"),
+                            ("Max instances skips",
+                             "scheduler_job_max_instances_total"),
+                            ("Overlaps", "scheduler_job_overlaps_total")]:
+            for labels, counter in metrics.counters(name).items():
+                job = ", ".join(value for _, value in labels)
+                counts.append(f"{title} ({job}): {int(counter.value)}")
+        em_msg.add_field(name="Counters",
+                         value="\n".join(counts)[:1024] or "-",
+                         inline=False)
+        await interaction.response.send_message(embed=em_msg)
+
+    @app_commands.command(description="Show the slowest recent commands " +
+                                      "and their upstream requests")
+    @app_commands.check(check_isme)
+    async def traces(
+            self,
+            interaction: discord.Interaction,
+            amount: app_commands.Range[int, 1, 5] = 3
+    ) -> None:
+        em_msg = discord.Embed(
+            title=f"Slowest of the last {len(self.bot.tracer.traces)} " +
+                  "commands",
+            color=Color.GREEN)
+        for trace in self.bot.tracer.slowest(amount):
+            value = _waterfall(trace)
+            if len(value) > 1016:
+                value = value[:1012] + "\n..."
+            em_msg.add_field(
+                name=f"{trace.name} {format_ms(trace.duration)} " +
+                     f"<t:{int(trace.created)}:R>",
+                value=f"```\n{value}```",
+                inline=False)
+        if not em_msg.fields:
+            em_msg.description = "No traces recorded yet"
+        await interaction.response.send_message(embed=em_msg)
+
+    @schedstats.error
+    @traces.error
+    async def schedstats_error(
+        self,
+        interaction: discord.Interaction,
+        error: app_commands.errors.AppCommandError
+    ) -> None:
+        em_msg = discord.Embed(
+            title="Error",
+            color=Color.RED)
+        if isinstance(error, app_commands.errors.CheckFailure):
+            em_msg.description = "Error: Command can only be " + \
+                                 "invoked by <@227087936464748545>"
+        else:
+            em_msg.description = str(error)
+        await interaction.response.send_message(embed=em_msg)
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(SchedStats(bot))
@@ -6,9 +6,7 @@ from typing import (
     Optional,
     Dict,
     List,
-    Literal,
-    Union,
-    Any
+    Literal
 )
 
 import discord
@@ -16,7 +14,8 @@ from discord import app_commands
 from discord.ext import commands
 
 from utils import Color
-from components.views import Listings, AllLevelListings
+from components.render import send
+from components.views import MoreListings, next_listings
 
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
@@ -81,7 +80,6 @@ class Search(commands.Cog):
         self.logger = logging.getLogger("opportunity." + __name__)
         if buildings := self.bot.api.get_buildings():
             self.buildings = {item["name"]: item["name"] for item in buildings}
-        self.maxLevel = self.bot.data["maxLevel"]
 
     @app_commands.command(description="Search for buildings" +
                                       " on plots on AtomicHub")
@@ -147,94 +145,33 @@ class Search(commands.Cog):
         elif generation == "Gen 3":
             if temp := self.buildings.get(building + "-gen3", None):
                 building = temp
-        building = building + "_" + rarity[0] + str(level)
-        self.logger.info(f"Getting listings for {building}")
-        building_name: str = building.rsplit("_", 1)[0]
-        if level == "*":
-            level = "1"
-            building = building.replace("*", level)
-            listings = self.bot.api.get_listings(building, 1, amount)
-            lvl: int = int(level)
-            while not listings:
-                if lvl < int(self.maxLevel[building_name][rarity[0]]):
-                    building.replace(level, str(lvl+1))
-                    lvl += 1
-                    listings = self.bot.api.get_listings(building, 1, amount)
-                else:
-                    em_msg = discord.Embed(title="Listings", color=0xff0000)
-                    em_msg.add_field(
-                        name="Listings",
-                        value=f"No listings found. (level {str(lvl)})",
-                        inline=False)
-                    await interaction.followup.send(embed=em_msg)
-                    return
-            view = AllLevelListings(self.bot, building, lvl, 1)
-
-        else:
-            listings = self.bot.api.get_listings(building, 1, amount)
-            view = Listings(building, 1)
-            if not listings:
-                await interaction.followup.send(embed=discord.Embed(
-                    title="Error",
-                    description="Could not find any listings " +
-                                "matching the given parameters",
-                    color=Color.RED))
-                return
+        self.logger.info(f"Getting listings for {building}_{rarity[0]}" +
+                         f"{level}")
+        all_levels = level == "*"
+        found = await next_listings(self.bot, building, rarity[0],
+                                    1 if all_levels else int(level), 1,
+                                    amount, all_levels)
+        if not found:
+            await interaction.followup.send(embed=discord.Embed(
+                title="Error",
+                description="Could not find any listings " +
+                            "matching the given parameters",
+                color=Color.RED))
+            return
+        lvl, page, listings = found
+        more = MoreListings(building, rarity[0], lvl, page, amount,
+                            all_levels)
         description = f"Listings containing **{amount}** " + \
                       f"**{rarity} {list(args.items())[0][1]} " + \
-                      f"Level {level}** (page 1)"
+                      f"Level {lvl}** (page 1)"
         em_msg = discord.Embed(
             title="Listings",
             description=description,
             color=Color.GREEN)
-        self._build_embed(interaction, em_msg, listings)
-        await interaction.followup.send(embed=em_msg, view=view)
-
+        await send(interaction, self.bot.renderer.render(
+            interaction, em_msg, more.building, page, listings),
+            more.as_view())
 
-    def _build_embed(
-        self,
-        interaction: discord.Interaction,
-        em_msg: discord.Embed,
-        listings: Dict[Union[str, int], Any]
-    ) -> None:
-        mobile: bool = False
-        if interaction.guild:
-            user = interaction.guild.get_member(interaction.user.id)
-            if isinstance(user, discord.Member):
-                mobile = user.is_on_mobile()
-        if mobile:
-            for item in listings:
-                em_msg.add_field(
-                    name=f"{listings[item]['name']}",
-                    value="\n".join([
-                        f"[Link]({listings[item]['link']})",
-                        f"{listings[item]['price']} " +
-                        f"{listings[item]['token_symbol']}",
-                        listings[item]["land"]["rarity"]
-                        if isinstance(listings[item]["land"], dict)
-                        else "Bundle"])
-                )
-        else:
-            em_msg.add_field(
-                name="Listings",
-                value="\n".join([
-                    f"[Link]({listings[item]['link']})"
-                    for item in listings.keys()]),
-                inline=True)
-            em_msg.add_field(
-                name="Cost",
-                value="\n".join([
-                    str(listings[item]["price"]) +
-                    " " + listings[item]["token_symbol"]
-                    for item in listings.keys()]),
-                inline=True)
-            em_msg.add_field(
-                name="Land(s)",
-                value="\n".join([
-                    listings[item]["land"]["rarity"]
-                    if isinstance(listings[item]["land"], dict)
-                    else "Bundle" for item in listings.keys()]),
-                inline=True)
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(Search(bot))
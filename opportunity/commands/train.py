@@ -1,12 +1,12 @@
 import logging
-from sqlite3 import connect, Row
-import json
+from sqlite3 import connect
 
 # Annotation imports
 from typing import (
     TYPE_CHECKING,
     Dict,
     List,
+    Tuple,
     Any
 )
 
@@ -38,11 +38,25 @@ class Train(commands.Cog):
     def __init__(self, bot) -> None:
         self.bot: Bot = bot
         self.logger = logging.getLogger("opportunity." + __name__)
-        con = connect("/app/data/db/opportunity.sqlite")
-        con.row_factory = Row
-        cur = con.cursor()
-        cur.execute("SELECT * FROM prep WHERE category='training_hall_1'")
-        self.train_data = json.loads(dict(cur.fetchone())["recipes"])
+
+    def level_inputs(self, category: str, recipe_ids: List[str]
+                     ) -> Dict[str, List[Tuple[str, Any]]]:
+        ''' Return the (item, quantity) inputs of the given recipes '''
+        con = connect(self.bot.gamedata.database)
+        params = ",".join("?" * len(recipe_ids))
+        rows = con.execute("SELECT r.recipe_id, i.item, i.quantity " +
+                           "FROM category_recipes r LEFT JOIN " +
+                           "recipe_inputs i USING (category, recipe_id) " +
+                           "WHERE r.category=? AND r.recipe_id IN " +
+                           f"({params}) ORDER BY i.position",
+                           (category, *recipe_ids)).fetchall()
+        con.close()
+        inputs: Dict[str, List[Tuple[str, Any]]] = {}
+        for recipe_id, item, quantity in rows:
+            inputs.setdefault(recipe_id, [])
+            if item is not None:
+                inputs[recipe_id].append((item, quantity))
+        return inputs
 
     @app_commands.command()
     @app_commands.autocomplete(profession=profession_ac)
@@ -71,28 +85,15 @@ class Train(commands.Cog):
                          f"to {end} for {profession}")
         profession_prep = profession.replace(" ", "").lower()
         profession_lv = profession_prep + "_Lv"
-        currlvl = start+1
+        category = "ground-control-mission" if profession == "Aerospace" \
+            else "training_hall_1"
+        levels = range(start+1, end+1)
+        inputs = self.level_inputs(
+            category, [profession_lv + str(lvl) for lvl in levels])
         result: Dict[str, Any] = {}
-        while currlvl <= int(end):
-            try:
-                if profession == "Aerospace":
-                    data = self.bot.data["prepared"]["ground-control-mission"]
-                    curr = data[profession_lv + str(currlvl)]
-                else:
-                    curr = self.train_data[profession_lv + str(currlvl)]
-                currinput = curr["inputs"]
-                for item in currinput:
-                    name = item["itemMatch"][0]
-                    if name in ["energy", "dusk"] or \
-                            "tool" in name or \
-                            "research" in name:
-                        if name not in result:
-                            result[name] = item["quantity"]*10 \
-                                if name == "energy" else item["quantity"]
-                        else:
-                            result[name] += item["quantity"]*10 \
-                                if name == "energy" else item["quantity"]
-            except KeyError:
+        for currlvl in levels:
+            if (currinput := inputs.get(profession_lv + str(currlvl))) \
+                    is None:
                 em_msg = discord.Embed(
                     title="Error",
                     description=f"No data found for " +
@@ -100,7 +101,16 @@ class Train(commands.Cog):
                     color=Color.RED)
                 await interaction.followup.send(embed=em_msg)
                 return
-            currlvl += 1
+            for name, quantity in currinput:
+                if name in ["energy", "dusk"] or \
+                        "tool" in name or \
+                        "research" in name:
+                    if name not in result:
+                        result[name] = quantity*10 \
+                            if name == "energy" else quantity
+                    else:
+                        result[name] += quantity*10 \
+                            if name == "energy" else quantity
         description = f"Requirements to train {profession} " + \
                       f"from {start} to {end}"
         em_msg = discord.Embed(
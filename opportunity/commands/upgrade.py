@@ -25,7 +25,6 @@ class Upgrade(commands.Cog):
     def __init__(self, bot) -> None:
         self.bot: Bot = bot
         self.logger = logging.getLogger("opportunity." + __name__)
-        self.upgrades = self.bot.data["buildingUpgrades"]
         if temp := self.bot.api.get_building_names_clean():
             self.temp = temp
         self.buildings_clean = [string.capwords(x.replace("_", " "), " ")
@@ -33,6 +32,11 @@ class Upgrade(commands.Cog):
         if buildings := self.bot.api.get_buildings():
             self.buildings = {item["name"]: item["name"] for item in buildings}
 
+    @property
+    def upgrades(self) -> Dict[str, Any]:
+        # read on every use so reloaded game data takes effect
+        return self.bot.data["buildingUpgrades"]
+
     async def building_ac(
         self,
         interaction: discord.Interaction,
@@ -0,0 +1,119 @@
+import logging
+import string
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    List,
+    Literal
+)
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import Color
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+    from components.cogs.price_watch import PriceWatch
+
+class Watches(commands.Cog):
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+
+    @property
+    def price_watch(self) -> "PriceWatch":
+        return self.bot.get_cog("PriceWatch")  # type: ignore
+
+    async def building_ac(
+        self,
+        interaction: discord.Interaction,
+        current: str,
+    ) -> List[app_commands.Choice[str]]:
+        choices = self.bot.data["clean_bldg"] or []
+        return [
+            app_commands.Choice(
+                name=string.capwords(building.replace("_", " ")),
+                value=building)
+            for building in choices if current.lower() in building.lower()
+        ][:25]
+
+    async def watch_ac(
+        self,
+        interaction: discord.Interaction,
+        current: str,
+    ) -> List[app_commands.Choice[int]]:
+        watches = self.price_watch.index.user_watches(interaction.user.id)
+        return [
+            app_commands.Choice(name=f"{watch} ({watch.id})", value=watch.id)
+            for watch in watches if current.lower() in str(watch).lower()
+        ][:25]
+
+    @app_commands.command(description="Get notified about new listings " +
+                                      "of a building below a price")
+    @app_commands.autocomplete(building=building_ac)
+    async def watch(
+            self,
+            interaction: discord.Interaction,
+            building: str,
+            rarity: Literal["Common", "Uncommon", "Rare", "Epic",
+                            "Legendary", "Mythic", "Special"],
+            max_price: int,
+            level: Optional[app_commands.Range[int, 1, 10]] = None,
+            token: Optional[Literal["WAX", "DUSK"]] = None,
+            dm: bool = False
+    ) -> None:
+        watch = self.price_watch.add_watch(
+            interaction.user.id,
+            None if dm else interaction.channel_id,
+            building, rarity[0], level, max_price, token)
+        self.logger.info(f"Added price watch {watch}")
+        await interaction.response.send_message(embed=discord.Embed(
+            title="Price watch",
+            description=f"You will be notified about **{watch}** " +
+                        f"(id **{watch.id}**)",
+            color=Color.GREEN))
+
+    @app_commands.command(description="Remove a price watch")
+    @app_commands.autocomplete(watch=watch_ac)
+    async def unwatch(
+            self,
+            interaction: discord.Interaction,
+            watch: int
+    ) -> None:
+        if self.price_watch.remove_watch(interaction.user.id, watch):
+            em_msg = discord.Embed(
+                title="Price watch",
+                description=f"Successfully removed watch **{watch}**",
+                color=Color.GREEN)
+        else:
+            em_msg = discord.Embed(
+                title="Error",
+                description=f"You have no watch with id **{watch}**",
+                color=Color.RED)
+        await interaction.response.send_message(embed=em_msg)
+
+    @app_commands.command(description="List your price watches")
+    async def watches(
+            self,
+            interaction: discord.Interaction
+    ) -> None:
+        watches = self.price_watch.index.user_watches(interaction.user.id)
+        em_msg = discord.Embed(
+            title=f"Price watches for {interaction.user.display_name}",
+            color=Color.GREEN)
+        em_msg.add_field(name="Watch", value="\n".join(
+            [str(watch) for watch in watches] if watches else ["-"]))
+        em_msg.add_field(name="Delivery", value="\n".join(
+            [f"<#{watch.channel_id}>" if watch.channel_id else "DM"
+             for watch in watches] if watches else ["-"]))
+        em_msg.add_field(name="ID", value="\n".join(
+            [str(watch.id) for watch in watches] if watches else ["-"]))
+        await interaction.response.send_message(embed=em_msg)
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Watches(bot))
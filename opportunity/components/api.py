@@ -1,5 +1,6 @@
 import requests
 import datetime as dt
+from urllib.parse import quote
 
 # Annotation imports
 from typing import (
@@ -10,6 +11,9 @@ from typing import (
     Union
 )
 
+from components.commandmetrics import upstream
+from components.tracing import Tracer
+
 wax_precision = 100000000
 
 class RequestException(Exception):
@@ -32,11 +36,42 @@ class API():
             self.config = bot.config
             url = self.config["yourls"]["url"]
             secret = self.config["yourls"]["secret"]
+        self.tracer: Tracer = bot.tracer if bot else Tracer()
         self.wax_dusk = "https://wax.alcor.exchange/api/markets/262"
         self.CMC_KEY = "5234f810-95e0-4977-94dc-25478c62b302"
         self.wax_usd = "https://pro-api.coinmarketcap.com/v2/" + \
                        "cryptocurrency/quotes/latest"
 
+    def _get(self, url: str, **kwargs: Any) -> requests.Response:
+        with upstream(), self.tracer.span(url) as span:
+            r = requests.get(url, **kwargs)
+            span.response(r)
+        return r
+
+    def quadrangle_url(self, quadrangle: str, page: int = 1,
+                       limit: int = 100) -> str:
+        ''' Return the URL of plot sales on a quadrangle, cheapest first '''
+        return f"https://wax.api.atomicassets.io/atomicmarket/v2/" + \
+               f"sales?state=1&collection_name=onmars" + \
+               f"&schema_name=land.plots&immutable_data.quadrangle=" + \
+               f"{quote(quadrangle, safe='')}&page={page}&limit={limit}" + \
+               f"&order=asc&sort=price"
+
+    def recent_listings_url(self, page: int = 1, limit: int = 100) -> str:
+        ''' Return the URL of plot sales, newest first '''
+        return f"https://wax.api.atomicassets.io/atomicmarket/v2/" + \
+               f"sales?state=1&collection_name=onmars" + \
+               f"&schema_name=land.plots" + \
+               f"&page={page}&limit={limit}&order=desc&sort=created"
+
+    def listings_url(self, building: str, page: int = 1, amount: int = 1,
+                     limit: int = 10) -> str:
+        ''' Return the URL of plot sales with a building, cheapest first '''
+        return f"https://wax.api.atomicassets.io/atomicmarket/v2/" + \
+               f"sales?state=1&collection_name=onmars" + \
+               f"&schema_name=land.plots&mutable_data.{building}={amount}" + \
+               f"&page={page}&limit={limit}&order=asc&sort=price"
+
     def get_listings(self, building: str, page_nr: int, amount: int = 1
                      ) -> Optional[Dict[Union[str, int], Any]]:
         '''
@@ -50,11 +85,8 @@ class API():
         '''
 
         listings = None
-        url = f"https://wax.api.atomicassets.io/atomicmarket/v2/" + \
-              f"sales?state=1&collection_name=onmars&schema_name=land.plots" + \
-              f"&mutable_data.{building}={amount}&page={page_nr}&limit=10" + \
-              f"&order=asc&sort=price"
-        r = requests.get(url)
+        url = self.listings_url(building, page_nr, amount)
+        r = self._get(url)
         try:
             if r.status_code != 200:
                 raise RequestException
@@ -117,7 +149,7 @@ class API():
         listings = None
         if "wax.api.atomicassets.io" not in url:
             raise ValueError
-        r = requests.get(url)
+        r = self._get(url)
         if r.status_code != 200:
             raise RequestException
         listings = r.json()['data']
@@ -156,7 +188,7 @@ class API():
         data = None
         url = "https://wax.api.atomicassets.io/atomicassets/v1/schemas/" + \
               "onmars/land.plots"
-        r = requests.get(url)
+        r = self._get(url)
         try:
             if r.status_code != 200:
                 raise RequestException
@@ -167,6 +199,24 @@ class API():
         except KeyError:
             return None
 
+    def get_asset(self, asset_id: str) -> Optional[Dict[str, Any]]:
+        '''
+        Get an AtomicAssets asset
+
+        Parameters:
+            asset_id (str): id of the asset
+
+        Returns:
+            None or json object of the asset
+        '''
+
+        url = "https://wax.api.atomicassets.io/atomicassets/v1/assets/" + \
+              asset_id
+        r = self._get(url)
+        if r.status_code != 200:
+            return None
+        return r.json().get("data")
+
     def extract_data(self, json: List[Dict[str, Any]], d: Any) -> List[Any]:
         data = []
         for item in json:
@@ -193,17 +243,17 @@ class API():
     def get_market_stats(self) -> Optional[Dict[str, Any]]:
         market_url = "https://milliononmars.io/api/v1/2d/marketItemStats"
         market_data = {}
-        market_data["data"] = requests.get(market_url).json()
+        market_data["data"] = self._get(market_url).json()
         market_data["timestamp"] = dt.datetime.now()
         return market_data
 
     def get_wax_usd(self) -> float:
-        r = requests.get(
+        r = self._get(
             self.wax_usd,
             headers={"X-CMC_PRO_API_KEY": self.CMC_KEY},
             params={"id": "2300"}).json()
         return r["data"]["2300"]["quote"]["USD"]["price"]
 
     def get_wax_dusk(self) -> float:
-        r = requests.get(self.wax_dusk).json()
+        r = self._get(self.wax_dusk).json()
         return r["last_price"]
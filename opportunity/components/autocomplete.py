@@ -0,0 +1,62 @@
+import string
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Optional
+)
+
+import discord
+from discord import app_commands
+
+from utils import translate_bldg
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+async def building_ac(
+    interaction: discord.Interaction,
+    current: str,
+) -> List[app_commands.Choice[str]]:
+    bot: Bot = interaction.client  # type: ignore
+    building: str = interaction.namespace.building
+    choices = []
+    if bot.data["clean_bldg"]:
+        choices = bot.data["clean_bldg"]
+        if len(building) >= 1:
+            choices = [s for s in choices if building.lower() in s.lower()]
+        if len(choices) > 25:
+            choices = []
+    return [
+        app_commands.Choice(
+            name=string.capwords(building.replace("_", " ")),
+            value=building)
+        for building in choices if current.lower() in building.lower()
+    ]
+
+async def recipe_ac(
+    interaction: discord.Interaction,
+    current: str,
+) -> List[app_commands.Choice[str]]:
+    bot: Bot = interaction.client  # type: ignore
+    building: str = interaction.namespace.building
+    level: int = interaction.namespace.level
+    category = ""
+    building = translate_bldg(building)
+    if not category:
+        category = building + "_C" + str(level)
+    recipes = bot.gamedata.recipes(category)
+    choices = list(recipes)
+    r: Optional[str] = interaction.namespace.recipe
+    if len(recipes) > 25:
+        if r:
+            choices = [s for s in choices if r.lower() in s.lower()]
+        else:
+            choices = []
+        if len(choices) > 25:
+            choices = []
+    return [
+        app_commands.Choice(name=recipes[recipe], value=recipe)
+        for recipe in choices if current.lower() in recipe.lower()
+    ]
@@ -1,5 +1,4 @@
 import logging
-import sqlite3
 
 import discord
 from discord.ext import commands
@@ -12,10 +11,13 @@ from apscheduler.triggers.cron import CronTrigger
 from typing import (
     TYPE_CHECKING,
     Dict,
+    List,
     Any
 )
 
 from utils import Color, get_dtm_listings
+from components.feed import ListingDiff, keyed, sale_id
+from components.ledger import NotificationLedger
 
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
@@ -26,10 +28,7 @@ class DTMAlert(commands.Cog):
         self.bot: Bot = bot
         self.logger = logging.getLogger("opportunity." + __name__)
         self.logger.info("Starting DTMAlert cog")
-        self.url = f"https://wax.api.atomicassets.io/atomicmarket/v2/" + \
-                   f"sales?state=1&collection_name=onmars" + \
-                   f"&schema_name=land.plots&immutable_data.quadrangle=" + \
-                   f"Coprates&page=1&limit=100&order=asc&sort=price"
+        self.url = self.bot.api.quadrangle_url("Coprates")
         self.bot.scheduler.add_job(
             self.alert,
             "interval",
@@ -38,66 +37,66 @@ class DTMAlert(commands.Cog):
             replace_existing=True,
             jobstore="memory")
 
-        self.database = self.bot.config["dtmalert"]["database"]
-        con = sqlite3.connect(self.database)
-        cur = con.cursor()
-        cur.execute("CREATE TABLE IF NOT EXISTS dtm_alert(name TEXT, " +
-                    "sale_id INT)")
-        con.commit()
-        con.close()
+        self.ledger = NotificationLedger(
+            self.bot.config["dtmalert"]["database"],
+            "dtm_alert",
+            int(self.bot.config.get("dtmalert", "retention_days",
+                                    fallback="30")))
+        # new listings of a failed send, retried while still listed
+        self.unsent: List[Dict[str, Any]] = []
 
     async def alert(self) -> None:
-        con = sqlite3.connect(self.database)
-        con.row_factory = sqlite3.Row
-        cur = con.cursor()
-        cur.execute("SELECT * FROM dtm_alert")
-        alreadyNotified = cur.fetchall()
+        self.ledger.prune()
+        await self.bot.snapshots.refresh(self.url)
+        listings = await self.bot.snapshots.view(self.url, "dtm",
+                                                 get_dtm_listings)
+        if listings is None:
+            return
+        diff = self.bot.feed.update(self.url, listings)
+        threshold = int(self.bot.config["dtmalert"]["threshold"])
 
-        if not (listings := self.bot.api.get_custom_listings(self.url)):
+        def below(lis: Dict[str, Any]) -> bool:
+            return int(lis["price"]) <= threshold
+
+        listed = keyed(listings)
+        retry = [listed[key] for lis in self.unsent
+                 if (key := sale_id(lis)) in listed]
+        added: Dict[int, Dict[str, Any]] = {}
+        for lis in filter(below, retry + diff.added):
+            self.logger.debug("Found listing below or equal to threshold")
+            if sale_id(lis) in self.ledger:
+                self.logger.debug("Listing already notified, skipping")
+                continue
+            added[sale_id(lis)] = lis
+        delta = ListingDiff(
+            list(added.values()),
+            [] if diff.initial else list(filter(below, diff.removed)),
+            [(old, new) for old, new in diff.changed
+             if below(new) and new["price"] < old["price"]])
+        # only what was sent counts as notified
+        self.unsent = list(added.values())
+        if not delta:
+            self.logger.info("No new listings to notify")
             return
-        listings = get_dtm_listings(listings)
-        if not listings:
+        em_msg = discord.Embed(
+            title="DTM ALERT",
+            description="\n".join(delta.lines())[:4096],
+            color=Color.GREEN)
+        if not (ch_id := self.bot.config["dtmalert"]["channel_id"]):
+            self.logger.error("No channel_id in config file")
             return
-        threshold = int(self.bot.config["dtmalert"]["threshold"])
-        toBeNotified = []
-        for listing in listings:
-            notified = False
-            if int(listings[listing]["price"]) <= threshold:
-                self.logger.debug("Found listing below or equal to threshold")
-                for alrNot in alreadyNotified:
-                    lis = listings[listing]
-                    link = lis["link"].rsplit("/", 1)[1]
-                    if str(dict(alrNot)["sale_id"]) == link and \
-                            dict(alrNot)["name"] == lis["name"]:
-                        notified = True
-                        break
-                if notified:
-                    self.logger.debug("Listing already notified, skipping")
-                    continue
-                toBeNotified.append(listings[listing])
-                cur.execute("""INSERT INTO dtm_alert VALUES(?, ?)""",
-                            (listings[listing]["name"],
-                             listings[listing]["link"].rsplit("/", 1)[1]))
-        if toBeNotified:
-            em_msg = discord.Embed(
-                title="DTM ALERT",
-                color=Color.GREEN)
-            for lis in toBeNotified:
-                em_msg.add_field(
-                    name=lis["name"],
-                    value="\n".join([
-                        f"[Link]({lis['link']})",
-                        f"{str(lis['price'])} {lis['token_symbol']}"]))
-            if not (ch_id := self.bot.config["dtmalert"]["channel_id"]):
-                self.logger.error("No channel_id in config file")
-            if isinstance(channel := self.bot.get_channel(int(ch_id)),
+        if not isinstance(channel := self.bot.get_channel(int(ch_id)),
                           discord.TextChannel):
-                await channel.send(embed=em_msg)
-        else:
-            self.logger.info("No new listings to notify")
-        con.commit()
-        con.close()
-        return
+            self.logger.error(f"DTM alert channel {ch_id} not found")
+            return
+        try:
+            await channel.send(embed=em_msg)
+        except discord.HTTPException as e:
+            self.logger.warning(f"Could not send DTM alert, retrying " +
+                                f"next poll: {e}")
+            return
+        self.unsent = []
+        self.ledger.add_many((key, lis["name"]) for key, lis in added.items())
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(DTMAlert(bot))
@@ -1,130 +1,123 @@
+import asyncio
 import logging
 
 import discord
 from discord.ext import commands
-import datetime as dt
 
-from apscheduler.triggers.combining import OrTrigger
 from apscheduler.triggers.cron import CronTrigger
 
 # Annotation imports
 from typing import (
-    TYPE_CHECKING
+    TYPE_CHECKING,
+    Dict,
+    List
 )
 
+from components.events import Event, EventStore
+
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
 
 class Notifications(commands.Cog):
+    """ Announces recurring in-game events from the events table.
 
-    ex_ch_id = 1038886699587076216  # Explorer channel id
-    ex2_r_id = 1038880989662957660  # 2x Explorer role id
-    ex_r_id = 1065156457244405821  # 1x Explorer role id
-
-    ha_ch_id = 1054020390114045985  # Hauler channel id
-    ha_r_id = 1054020653247901868  # Hauler role id
-
-    happy_ch_id = 1054011400583925792  # Happy Hour channel id
-    happy_r_id = 1042527035467235500  # Happy Hour role id
-
-    rp_ch_id = 00000  # Research paper channel id
-    rp_r_id = 1074766817148555285  # Research paper role id
-
-    triggers = {
-        "hauler": CronTrigger(hour=12, minute=40, day_of_week="sun,wed"),
-        "happyhour_start": OrTrigger([
-            CronTrigger(hour=1, minute=0, day_of_week="sat,sun"),
-            CronTrigger(hour=13, minute=0, day_of_week="sat,sun")]),
-        "happyhour_end": OrTrigger([
-            CronTrigger(hour=3, minute=50, day_of_week="sat,sun"),
-            CronTrigger(hour=15, minute=50, day_of_week="sat,sun")]),
-        "explorer_24h_before": CronTrigger(hour=1,
-                                           minute=0,
-                                           day_of_week="sun,wed"),
-        "explorer_start": CronTrigger(hour=1, minute=0, day_of_week="mon,thu"),
-        "explorer_end": CronTrigger(hour=0, minute=50, day_of_week="tue,fri"),
-    }
+    Events sharing a crontab are fired by a single scheduler job that
+    announces all of them in one pass. Channels and roles are resolved
+    from a cache that is rebuilt on guild, channel and role events.
+    Reload the cog to pick up changes to the table.
+    """
 
     def __init__(self, bot) -> None:
         self.bot: Bot = bot
         self.logger = logging.getLogger("opportunity." + __name__)
         self.logger.info("Starting Notifications cog")
-        for func in [self.explorer_start, self.explorer_end, self.hauler,
-                     self.happyhour_start, self.happyhour_end]:
-            if trigger := self.triggers.get(str(func.__name__)):
-                self.bot.scheduler.add_job(
-                    func,
-                    trigger=trigger,
-                    jobstore="memory",
-                    id=func.__name__,
-                    replace_existing=True
-                )
-
-        if isinstance(ex_ch := self.bot.get_channel(self.ex_ch_id),
-                      discord.abc.GuildChannel):
-            self.ex_ch = ex_ch
-            self.ex_r = discord.utils.get(ex_ch.guild.roles, id=self.ex_r_id)
-            self.ex2_r = discord.utils.get(ex_ch.guild.roles, id=self.ex2_r_id)
-
-        if isinstance(ha_ch := self.bot.get_channel(self.ha_ch_id),
-                      discord.abc.GuildChannel):
-            self.ha_ch = ha_ch
-            self.ha_r = discord.utils.get(ha_ch.guild.roles, id=self.ha_r_id)
-
-        if isinstance(hh_ch := self.bot.get_channel(self.happy_ch_id),
-                      discord.abc.GuildChannel):
-            self.happy_ch = hh_ch
-            self.happy_r = discord.utils.get(hh_ch.guild.roles,
-                                             id=self.happy_r_id)
-
-    async def explorer_24h_before(self) -> None:
-        if (isinstance(self.ex_ch, discord.TextChannel) and
-                isinstance(self.ex2_r, discord.Role)):
-            await self.ex_ch.send(f"{self.ex2_r.mention}\n" +
-                                  f"Explorer Missions will be" +
-                                  f"available in 24 hours. " +
-                                  f"Make sure to plan accordingly.")
-
-    async def explorer_start(self) -> None:
-        ending = dt.datetime.now() + dt.timedelta(days=1)
-        time = f"<t:{int(ending.timestamp())}:R>"
-        if (isinstance(self.ex_ch, discord.TextChannel) and
-                isinstance(self.ex_r, discord.Role) and
-                isinstance(self.ex2_r, discord.Role)):
-            await self.ex_ch.send(f"{self.ex_r.mention} {self.ex2_r.mention}" +
-                                  f"\nExplorer Missions are now " +
-                                  f"available for 24 hours. " +
-                                  f"Ending {time}")
-
-    async def explorer_end(self) -> None:
-        if (isinstance(self.ex_ch, discord.TextChannel) and
-                isinstance(self.ex_r, discord.Role) and
-                isinstance(self.ex2_r, discord.Role)):
-            await self.ex_ch.send(f"{self.ex_r.mention} {self.ex2_r.mention}" +
-                                  "\nExplorer Missions are only " +
-                                  "available for another 10 minutes.")
-
-    async def hauler(self) -> None:
-        if (isinstance(self.ha_ch, discord.TextChannel) and
-                isinstance(self.ha_r, discord.Role)):
-            await self.ha_ch.send(f"{self.ha_r.mention}\n" +
-                                  "Do not start any hauler missions " +
-                                  "to leave slots for explorers open")
-
-    async def happyhour_start(self) -> None:
-        ending = dt.datetime.now() + dt.timedelta(hours=3)
-        time = f"<t:{int(ending.timestamp())}:R>"
-        if (isinstance(self.happy_ch, discord.TextChannel) and
-                isinstance(self.happy_r, discord.Role)):
-            await self.happy_ch.send(f"{self.happy_r.mention}\n" +
-                                     f"Happy hour is now available " +
-                                     f"for 3 hours")
-
-    async def happyhour_end(self) -> None:
-        if (isinstance(self.happy_ch, discord.TextChannel) and
-                isinstance(self.happy_r, discord.Role)):
-            await self.happy_ch.send(f"{self.happy_r.mention}\n" +
-                                     "Happy Hour ends in 10 minutes.")
+        config = self.bot.config
+        database = config.get("events", "database", fallback="") or \
+            config["dtmalert"]["database"]
+        self.store = EventStore(database)
+        self.events: Dict[str, List[Event]] = {}  # crontab -> events
+        for event in self.store.load():
+            self.events.setdefault(event.crontab, []).append(event)
+        self._channels: Dict[int, discord.TextChannel] = {}
+        self._roles: Dict[int, discord.Role] = {}
+        self.refresh()
+        for crontab in self.events:
+            self.bot.scheduler.add_job(
+                self.fire,
+                trigger=CronTrigger.from_crontab(crontab),
+                args=[crontab],
+                jobstore="memory",
+                id=f"events:{crontab}",
+                replace_existing=True)
+
+    async def cog_unload(self) -> None:
+        for crontab in self.events:
+            self.bot.scheduler.remove_job(f"events:{crontab}", "memory")
+
+    def refresh(self) -> None:
+        ''' Rebuild the channel and role cache of all events '''
+        channels = {}
+        roles = {}
+        for events in self.events.values():
+            for event in events:
+                channel = self.bot.get_channel(event.channel_id)
+                if not isinstance(channel, discord.TextChannel) or \
+                        event.guild_id not in (None, channel.guild.id):
+                    continue
+                channels[event.channel_id] = channel
+                for role_id in event.role_ids:
+                    if role := channel.guild.get_role(role_id):
+                        roles[role_id] = role
+        self._channels = channels
+        self._roles = roles
+        self.logger.debug(f"Cached {len(channels)} event channels and " +
+                          f"{len(roles)} roles")
+
+    async def fire(self, crontab: str) -> None:
+        results = await asyncio.gather(
+            *(self.announce(event) for event in self.events.get(crontab, [])),
+            return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Could not announce event: {result}")
+
+    async def announce(self, event: Event) -> None:
+        if not (channel := self._channels.get(event.channel_id)):
+            self.logger.warning(f"Channel of event {event.name} not found")
+            return
+        roles = " ".join(role.mention for role_id in event.role_ids
+                         if (role := self._roles.get(role_id)))
+        await channel.send(event.render(roles))
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        self.refresh()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.refresh()
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        self.refresh()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(
+            self, channel: discord.abc.GuildChannel) -> None:
+        self.refresh()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(
+            self, channel: discord.abc.GuildChannel) -> None:
+        self.refresh()
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self.refresh()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.refresh()
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(Notifications(bot))
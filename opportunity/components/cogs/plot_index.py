@@ -0,0 +1,84 @@
+import logging
+
+from discord.ext import commands
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Tuple,
+    Any
+)
+
+from utils import land_coords, listing_lands
+from components.feed import sale_id
+from components.spatial import SpatialIndex
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+class PlotIndex(commands.Cog):
+    """ Keeps a nearest-neighbour index over all listed plots.
+
+    Every poll walks the plot sales pages, diffs them against the
+    previous poll and only inserts or removes the lands that changed.
+    """
+
+    query = "plotindex"
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self.logger.info("Starting PlotIndex cog")
+        config = self.bot.config
+        self.pages = int(config.get("plotindex", "pages", fallback="") or 20)
+        self.index = SpatialIndex()
+        self.bot.scheduler.add_job(
+            self.poll,
+            "interval",
+            minutes=int(config.get("plotindex", "interval",
+                                   fallback="") or 10),
+            id="plotindex",
+            replace_existing=True,
+            jobstore="memory")
+
+    async def poll(self) -> None:
+        listings: Dict[int, Dict[str, Any]] = {}
+        for page in range(1, self.pages + 1):
+            url = self.bot.api.recent_listings_url(page)
+            if not (found := await self.bot.snapshots.refresh(url)):
+                break
+            for listing in found.values():
+                listings[sale_id(listing)] = listing
+            if len(found) < 100:
+                break
+        diff = self.bot.feed.update(self.query, listings)
+        for listing in diff.removed:
+            for land in listing_lands(listing):
+                self.index.remove(land["asset_id"])
+        for listing in diff.added + [new for _, new in diff.changed]:
+            for land in listing_lands(listing):
+                if coords := land_coords(land):
+                    self.index.insert(land["asset_id"], *coords, listing)
+        if diff.initial:
+            self.index.rebuild()
+        self.logger.debug(f"Indexed {len(self.index)} plots")
+
+    def nearest(self, lat: float, lon: float,
+                k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        ''' Return (distance in km, listing) of the k nearest sales '''
+        sales: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        want = k
+        while len(sales) < k:
+            found = self.index.nearest(lat, lon, want)
+            for distance, _, listing in found:
+                sales.setdefault(sale_id(listing), (distance, listing))
+            # bundles take several entries, widen the search if needed
+            if len(found) < want:
+                break
+            want *= 2
+        return sorted(sales.values(), key=lambda pair: pair[0])[:k]
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(PlotIndex(bot))
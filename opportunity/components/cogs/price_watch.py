@@ -0,0 +1,160 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Any
+)
+
+from utils import Color
+from components.feed import sale_id
+from components.ledger import NotificationLedger
+from components.watches import Watch, WatchIndex, WatchStore
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+# (channel id, None) for channel posts, (None, user id) for DMs
+Destination = Tuple[Optional[int], Optional[int]]
+
+class PriceWatch(commands.Cog):
+    """ Evaluates all user price watches against new marketplace listings.
+
+    Each poll fetches the newest plot sales once and matches every
+    listing not seen before through the watch index. Matches are sent as
+    one message per channel or per direct message recipient.
+    """
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self.logger.info("Starting PriceWatch cog")
+        config = self.bot.config
+        database = config.get("pricewatch", "database", fallback="") or \
+            config["dtmalert"]["database"]
+        self.store = WatchStore(database)
+        self.index = WatchIndex()
+        for watch in self.store.load():
+            self.index.add(watch)
+        self.ledger = NotificationLedger(
+            database,
+            "price_watch_alert",
+            int(config.get("dtmalert", "retention_days", fallback="30")),
+            scoped=True)
+        self.last_sale_id = 0
+        self.bot.scheduler.add_job(
+            self.poll,
+            "interval",
+            minutes=int(config.get("pricewatch", "interval",
+                                   fallback="") or 2),
+            id="pricewatch",
+            replace_existing=True,
+            jobstore="memory")
+
+    def add_watch(self, user_id: int, channel_id: Optional[int],
+                  building: str, rarity: str, level: Optional[int],
+                  max_price: int, token_symbol: Optional[str]) -> Watch:
+        watch = self.store.add(user_id, channel_id, building, rarity, level,
+                               max_price, token_symbol)
+        self.index.add(watch)
+        return watch
+
+    def remove_watch(self, user_id: int, watch_id: int) -> bool:
+        if not self.store.remove(user_id, watch_id):
+            return False
+        self.index.remove(watch_id)
+        # ids of tables created before AUTOINCREMENT can be reused
+        self.ledger.forget_scope(watch_id)
+        return True
+
+    async def poll(self) -> None:
+        self.ledger.prune()
+        if not self.index.watches:
+            return
+        url = self.bot.api.recent_listings_url()
+        if not (listings := await self.bot.snapshots.refresh(url)):
+            return
+        matches: Dict[Destination, List[Tuple[Watch, Dict[str, Any]]]] = {}
+        newest = self.last_sale_id
+        for listing in listings.values():
+            sale = sale_id(listing)
+            newest = max(newest, sale)
+            if sale <= self.last_sale_id:
+                continue
+            for watch in self.index.match(listing):
+                if (watch.id, sale) in self.ledger:
+                    continue
+                destination: Destination = (watch.channel_id, None) \
+                    if watch.channel_id else (None, watch.user_id)
+                matches.setdefault(destination, []).append((watch, listing))
+        for destination, found in matches.items():
+            try:
+                await self._send(destination, found)
+            except discord.HTTPException as e:
+                self.logger.error(f"Could not deliver price watch " +
+                                  f"matches to {destination}, retrying " +
+                                  f"next poll: {e}")
+                # keep the cursor before the first undelivered sale, the
+                # delivered ones are skipped through the ledger
+                newest = min([newest] + [
+                    sale_id(lis) - 1 for watch, lis in found
+                    if (watch.id, sale_id(lis)) not in self.ledger])
+        self.last_sale_id = newest
+
+    async def _send(self, destination: Destination,
+                    found: List[Tuple[Watch, Dict[str, Any]]]) -> None:
+        '''
+        Send the matches, recording each embed once it was sent
+
+        Destinations that are gone or refuse messages are skipped, as
+        retrying them would never succeed.
+
+        Raises:
+            discord.HTTPException: if sending failed otherwise
+        '''
+        channel_id, user_id = destination
+        target: Optional[discord.abc.Messageable] = None
+        try:
+            if channel_id:
+                target = self.bot.get_channel(channel_id)  # type: ignore
+            elif user_id:
+                target = self.bot.get_user(user_id) or \
+                    await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            pass
+        if not isinstance(target, (discord.TextChannel, discord.User)):
+            self.logger.warning(f"Price watch destination {destination} " +
+                                f"not found")
+            return
+        for i in range(0, len(found), 25):
+            mentions = dict.fromkeys(f"<@{watch.user_id}>"
+                                     for watch, _ in found[i:i+25])
+            em_msg = discord.Embed(title="PRICE WATCH", color=Color.GREEN)
+            for watch, lis in found[i:i+25]:
+                em_msg.add_field(
+                    name=lis["name"],
+                    value="\n".join([
+                        f"[Link]({lis['link']})",
+                        f"{str(lis['price'])} {lis['token_symbol']}",
+                        f"<@{watch.user_id}>: {watch}"]))
+            try:
+                await target.send(
+                    content=" ".join(mentions) if channel_id else None,
+                    embed=em_msg)
+            except discord.Forbidden as e:
+                self.logger.warning(f"Price watch destination " +
+                                    f"{destination} refused matches: {e}")
+                return
+            self.ledger.add_many(
+                ((watch.id, sale_id(lis)), lis["name"])
+                for watch, lis in found[i:i+25])
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(PriceWatch(bot))
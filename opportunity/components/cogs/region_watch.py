@@ -0,0 +1,131 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Any
+)
+
+from utils import Color, PlotCoords
+from components.feed import sale_id
+from components.ledger import NotificationLedger
+from components.regions import Point, Region, RegionIndex, RegionStore
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+class RegionWatch(commands.Cog):
+    """ Alerts guilds about cheap plots inside their registered regions.
+
+    Every poll fetches each quadrangle with at least one region once and
+    matches its plots against all regions through a grid index.
+    """
+
+    def __init__(self, bot) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self.logger.info("Starting RegionWatch cog")
+        config = self.bot.config
+        database = config.get("regions", "database", fallback="") or \
+            config["dtmalert"]["database"]
+        self.store = RegionStore(database)
+        self.index = RegionIndex()
+        for region in self.store.load():
+            try:
+                self.index.add(region)
+            except ValueError as e:
+                self.logger.error(f"Skipping region {region.name} of " +
+                                  f"guild {region.guild_id}: {e}")
+        self.ledger = NotificationLedger(
+            database,
+            "region_alert",
+            int(config.get("dtmalert", "retention_days", fallback="30")),
+            scoped=True)
+        self.bot.scheduler.add_job(
+            self.poll,
+            "interval",
+            minutes=int(config.get("regions", "interval", fallback="") or 5),
+            id="regionwatch",
+            replace_existing=True,
+            jobstore="memory")
+
+    def add_region(self, guild_id: int, channel_id: int, name: str,
+                   quadrangle: str, polygon: List[Point],
+                   threshold: int) -> Region:
+        '''
+        Store and index a region
+
+        Raises:
+            ValueError: if the index refuses the region, nothing is stored
+            sqlite3.IntegrityError: if the guild already has a region
+                with that name
+        '''
+        self.index.check(Region(0, guild_id, channel_id, name, quadrangle,
+                                polygon, threshold))
+        region = self.store.add(guild_id, channel_id, name, quadrangle,
+                                polygon, threshold)
+        self.index.add(region)
+        return region
+
+    def remove_region(self, guild_id: int, name: str) -> bool:
+        if (region_id := self.store.remove(guild_id, name)) is None:
+            return False
+        self.index.remove(region_id)
+        # ids of tables created before AUTOINCREMENT can be reused
+        self.ledger.forget_scope(region_id)
+        return True
+
+    async def poll(self) -> None:
+        self.ledger.prune()
+        # channel id -> matching (region, listing) pairs
+        matches: Dict[int, List[Tuple[Region, Dict[str, Any]]]] = {}
+        for quadrangle in self.index.quadrangles():
+            url = self.bot.api.quadrangle_url(quadrangle)
+            if not (listings := await self.bot.snapshots.refresh(url)):
+                continue
+            coords = PlotCoords(listings)
+            for region, mask in self.index.match(coords, quadrangle):
+                for sale, key in coords.matching(mask).items():
+                    listing = listings[key]
+                    if int(listing["price"]) > region.threshold or \
+                            (region.id, sale) in self.ledger:
+                        continue
+                    matches.setdefault(region.channel_id, []).append(
+                        (region, listing))
+        for channel_id, found in matches.items():
+            await self._send(channel_id, found)
+
+    async def _send(self, channel_id: int,
+                    found: List[Tuple[Region, Dict[str, Any]]]) -> None:
+        ''' Send the matches, recording each embed once it was sent '''
+        channel = self.bot.get_channel(channel_id)
+        if not isinstance(channel, discord.TextChannel):
+            self.logger.warning(f"Region channel {channel_id} not found")
+            return
+        for i in range(0, len(found), 25):
+            em_msg = discord.Embed(title="REGION ALERT", color=Color.GREEN)
+            for region, lis in found[i:i+25]:
+                em_msg.add_field(
+                    name=f"{lis['name']} ({region.name})",
+                    value="\n".join([
+                        f"[Link]({lis['link']})",
+                        f"{str(lis['price'])} {lis['token_symbol']}"]))
+            try:
+                await channel.send(embed=em_msg)
+            except discord.HTTPException as e:
+                self.logger.warning(f"Could not send region alert to " +
+                                    f"{channel_id}, retrying next poll: {e}")
+                return
+            self.ledger.add_many(
+                ((region.id, sale_id(lis)), lis["name"])
+                for region, lis in found[i:i+25])
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(RegionWatch(bot))
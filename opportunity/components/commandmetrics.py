@@ -0,0 +1,182 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+import discord
+from discord import app_commands
+
+# Annotation imports
+from typing import (
+    Any,
+    Iterator,
+    Optional
+)
+
+from components.metrics import MetricsRegistry
+from components.tracing import Trace
+
+DEADLINE = 3.0  # seconds Discord waits for the first response
+
+class CommandTiming:
+    """ Timing of one interaction, split into phases.
+
+    Attributes:
+        name --- qualified command name
+        kind --- "command" or "autocomplete"
+        acknowledged --- seconds from the interaction's creation until
+            the first response (defer, message, autocomplete result)
+        upstream --- seconds spent waiting for upstream APIs
+    """
+
+    def __init__(self, interaction: discord.Interaction) -> None:
+        command = interaction.command
+        self.name = command.qualified_name if command else "unknown"
+        self.kind = "autocomplete" if \
+            interaction.type is discord.InteractionType.autocomplete \
+            else "command"
+        self.created = interaction.created_at.timestamp()
+        self.started = time.perf_counter()
+        self.acknowledged: Optional[float] = None
+        self.upstream = 0.0
+        self.finished = False
+        self.trace: Optional[Trace] = None
+
+    def acknowledge(self) -> None:
+        if self.acknowledged is None:
+            self.acknowledged = max(time.time() - self.created, 0.0)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+current_timing: contextvars.ContextVar[Optional[CommandTiming]] = \
+    contextvars.ContextVar("current_timing", default=None)
+
+@contextmanager
+def upstream() -> Iterator[None]:
+    ''' Attribute the time spent in the block to the current command '''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if (timing := current_timing.get()) is not None:
+            timing.upstream += time.perf_counter() - start
+
+class TimedResponse(discord.InteractionResponse):
+    """ Interaction response that notes when it was first used. """
+
+    __slots__ = ("timing",)
+
+    def __init__(self, parent: discord.Interaction,
+                 timing: CommandTiming) -> None:
+        super().__init__(parent)
+        self.timing = timing
+
+    async def defer(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().defer(*args, **kwargs)
+        finally:
+            self.timing.acknowledge()
+
+    async def send_message(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().send_message(*args, **kwargs)
+        finally:
+            self.timing.acknowledge()
+
+    async def edit_message(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().edit_message(*args, **kwargs)
+        finally:
+            self.timing.acknowledge()
+
+    async def send_modal(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().send_modal(*args, **kwargs)
+        finally:
+            self.timing.acknowledge()
+
+    async def autocomplete(self, *args: Any, **kwargs: Any) -> None:
+        try:
+            await super().autocomplete(*args, **kwargs)
+        except Exception:
+            record(self._parent.client, self.timing, "error")
+            raise
+        self.timing.acknowledge()
+        # autocompletes are done once they answered
+        record(self._parent.client, self.timing, "success")
+
+def describe(metrics: MetricsRegistry) -> None:
+    metrics.describe("command_duration_seconds",
+                     "Time from invocation until the handler returned")
+    metrics.describe("command_defer_seconds",
+                     "Time from interaction creation until first response")
+    metrics.describe("command_upstream_seconds",
+                     "Time a command spent waiting for upstream APIs")
+    metrics.describe("command_render_seconds",
+                     "Time a command spent outside of upstream calls")
+    metrics.describe("command_invocations_total",
+                     "Command and autocomplete invocations by outcome")
+    metrics.describe("command_deadline_missed_total",
+                     f"Interactions not answered within {DEADLINE:g}s")
+
+def record(client: Any, timing: CommandTiming, outcome: str) -> None:
+    ''' Record a finished interaction, once '''
+    if timing.finished:
+        return
+    timing.finished = True
+    if timing.trace:
+        client.tracer.finish(timing.trace)
+    metrics: MetricsRegistry = client.metrics
+    labels = {"command": timing.name, "kind": timing.kind}
+    elapsed = timing.elapsed
+    metrics.histogram("command_duration_seconds", **labels).observe(elapsed)
+    metrics.histogram("command_upstream_seconds", **labels).observe(
+        timing.upstream)
+    metrics.histogram("command_render_seconds", **labels).observe(
+        max(elapsed - timing.upstream, 0.0))
+    if timing.acknowledged is not None:
+        metrics.histogram("command_defer_seconds", **labels).observe(
+            timing.acknowledged)
+    if timing.acknowledged is None or timing.acknowledged > DEADLINE:
+        metrics.counter("command_deadline_missed_total", **labels).inc()
+    metrics.counter("command_invocations_total", outcome=outcome,
+                    **labels).inc()
+
+class MetricsTree(app_commands.CommandTree):
+    """ Command tree that times every command and autocomplete.
+
+    ``interaction_check`` starts the timing and makes it the current
+    one for the task handling the interaction, so upstream calls can
+    add to it. Commands are recorded on completion or error,
+    autocompletes once they answered. discord.py logs and drops the
+    exceptions of autocompletes, so one that ends without answering is
+    recorded as an error.
+    """
+
+    async def interaction_check(self,
+                                interaction: discord.Interaction) -> bool:
+        timing = CommandTiming(interaction)
+        interaction.extras["timing"] = timing
+        # pre-fill the cached response like discord.py does for command
+        interaction._cs_response = TimedResponse(  # type: ignore
+            interaction, timing)
+        current_timing.set(timing)
+        timing.trace = self.client.tracer.start(  # type: ignore
+            timing.name, interaction.id)
+        return True
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        try:
+            await super()._call(interaction)
+        finally:
+            if interaction.type is discord.InteractionType.autocomplete \
+                    and (timing := interaction.extras.get("timing")):
+                record(self.client, timing, "error")
+
+    async def on_error(self, interaction: discord.Interaction,
+                       error: app_commands.AppCommandError) -> None:
+        if timing := interaction.extras.get("timing"):
+            record(self.client, timing, "error")
+        await super().on_error(interaction, error)
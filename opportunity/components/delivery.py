@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+import discord
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Tuple
+)
+
+from utils import Color
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+class ReminderDelivery:
+    """ Batches reminders that become due within a short window.
+
+    Reminders are collected per channel and sent as a single message
+    mentioning every affected user, so a burst of reminders costs one
+    request per channel instead of one request per reminder.
+    """
+
+    max_users = 25  # embed field limit
+    max_embed = 5900  # 6000 characters per embed minus the title
+
+    def __init__(self, bot, window: float = 2.0) -> None:
+        self.bot: Bot = bot
+        self.window = window
+        self.logger = logging.getLogger("opportunity." + __name__)
+        # channel id -> user id -> task names
+        self._pending: Dict[int, Dict[int, List[str]]] = {}
+        self._flushers: Dict[int, asyncio.Task] = {}
+
+    def enqueue(self, user: int, channel_id: int, task_name: str) -> None:
+        users = self._pending.setdefault(channel_id, {})
+        users.setdefault(user, []).append(task_name)
+        if channel_id not in self._flushers:
+            self._flushers[channel_id] = asyncio.create_task(
+                self._flush_later(channel_id))
+
+    async def _flush_later(self, channel_id: int) -> None:
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            del self._flushers[channel_id]
+        users = self._pending.pop(channel_id, {})
+        try:
+            await self._deliver(channel_id, users)
+        except discord.HTTPException as e:
+            self.logger.error(f"Could not deliver reminders to " +
+                              f"channel {channel_id}: {e}")
+
+    async def _deliver(self, channel_id: int,
+                       users: Dict[int, List[str]]) -> None:
+        channel = self.bot.get_channel(channel_id)
+        if not isinstance(channel, discord.TextChannel):
+            self.logger.warning(f"Dropping {len(users)} reminder(s) for " +
+                                f"unknown channel {channel_id}")
+            return
+        # (mention, field name, field value) per user
+        fields = []
+        for user_id, tasks in users.items():
+            member = channel.guild.get_member(user_id)
+            names = ", ".join(f"**{task}**" for task in tasks)
+            fields.append((member.mention if member else f"<@{user_id}>",
+                           member.display_name if member else str(user_id),
+                           f"Your {names} tasks are ready"[:1024]))
+        chunks: List[List[Tuple[str, str, str]]] = [[]]
+        size = 0
+        for field in fields:
+            length = len(field[1]) + len(field[2])
+            if chunks[-1] and (len(chunks[-1]) >= self.max_users or
+                               size + length > self.max_embed):
+                chunks.append([])
+                size = 0
+            chunks[-1].append(field)
+            size += length
+        for chunk in chunks:
+            em_msg = discord.Embed(title="Reminders", color=Color.GREEN)
+            for _, name, value in chunk:
+                em_msg.add_field(name=name, value=value, inline=False)
+            await channel.send(content=" ".join(m for m, _, _ in chunk),
+                               embed=em_msg)
@@ -0,0 +1,102 @@
+import datetime as dt
+import json
+import sqlite3
+
+# Annotation imports
+from typing import (
+    List,
+    Optional
+)
+
+class Event:
+    """ A recurring in-game event announced in a channel.
+
+    Attributes:
+        crontab --- "minute hour day month day_of_week" in scheduler time
+        guild_id --- guild of the channel, None to take it from the channel
+        role_ids --- roles mentioned by the announcement
+        template --- message text, may contain {roles} and {ends}
+        duration --- minutes until the event ends, used for {ends}
+    """
+
+    def __init__(self, id: int, name: str, crontab: str,
+                 guild_id: Optional[int], channel_id: int,
+                 role_ids: List[int], template: str,
+                 duration: int = 0) -> None:
+        self.id = id
+        self.name = name
+        self.crontab = crontab
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.role_ids = role_ids
+        self.template = template
+        self.duration = duration
+
+    def render(self, roles: str) -> str:
+        ending = dt.datetime.now() + dt.timedelta(minutes=self.duration)
+        return self.template.format(roles=roles,
+                                    ends=f"<t:{int(ending.timestamp())}:R>")
+
+
+explorer_ch = 1038886699587076216
+explorer_2x_r = 1038880989662957660
+explorer_r = 1065156457244405821
+hauler_ch = 1054020390114045985
+hauler_r = 1054020653247901868
+happy_ch = 1054011400583925792
+happy_r = 1042527035467235500
+
+# (name, crontab, channel, roles, template, duration) of the events the
+# bot announced before they were configurable
+default_events = [
+    ("explorer_24h_before", "0 1 * * sun,wed", explorer_ch,
+     [explorer_2x_r], "{roles}\nExplorer Missions will be available in " +
+     "24 hours. Make sure to plan accordingly.", 0),
+    ("explorer_start", "0 1 * * mon,thu", explorer_ch,
+     [explorer_r, explorer_2x_r], "{roles}\nExplorer Missions are now " +
+     "available for 24 hours. Ending {ends}", 24 * 60),
+    ("explorer_end", "50 0 * * tue,fri", explorer_ch,
+     [explorer_r, explorer_2x_r], "{roles}\nExplorer Missions are only " +
+     "available for another 10 minutes.", 0),
+    ("hauler", "40 12 * * sun,wed", hauler_ch, [hauler_r],
+     "{roles}\nDo not start any hauler missions to leave slots for " +
+     "explorers open", 0),
+    ("happyhour_start", "0 1,13 * * sat,sun", happy_ch, [happy_r],
+     "{roles}\nHappy hour is now available for 3 hours", 3 * 60),
+    ("happyhour_end", "50 3,15 * * sat,sun", happy_ch, [happy_r],
+     "{roles}\nHappy Hour ends in 10 minutes.", 0),
+]
+
+class EventStore:
+    """ Persists events in a sqlite table, seeded with the defaults. """
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+        con = sqlite3.connect(self.database)
+        with con:
+            exists = con.execute("SELECT name FROM sqlite_master WHERE " +
+                                 "type='table' AND name='events'").fetchone()
+            con.execute("CREATE TABLE IF NOT EXISTS events(" +
+                        "id INTEGER PRIMARY KEY, name TEXT NOT NULL, " +
+                        "crontab TEXT NOT NULL, guild_id INTEGER, " +
+                        "channel_id INTEGER NOT NULL, role_ids TEXT " +
+                        "NOT NULL, template TEXT NOT NULL, " +
+                        "duration INTEGER NOT NULL DEFAULT 0)")
+            if not exists:
+                con.executemany("INSERT INTO events(name, crontab, " +
+                                "channel_id, role_ids, template, duration) " +
+                                "VALUES(?, ?, ?, ?, ?, ?)",
+                                [(name, cron, channel, json.dumps(roles),
+                                  template, duration)
+                                 for name, cron, channel, roles, template,
+                                 duration in default_events])
+        con.close()
+
+    def load(self) -> List[Event]:
+        con = sqlite3.connect(self.database)
+        rows = con.execute("SELECT id, name, crontab, guild_id, channel_id, " +
+                           "role_ids, template, duration FROM events")
+        events = [Event(row[0], row[1], row[2], row[3], row[4],
+                        json.loads(row[5]), row[6], row[7]) for row in rows]
+        con.close()
+        return events
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple
+)
+
+Listing = Dict[str, Any]
+
+def sale_id(listing: Listing) -> int:
+    return int(listing["link"].rsplit("/", 1)[1])
+
+def keyed(listings: Dict[Any, Listing]) -> Dict[int, Listing]:
+    ''' Re-key custom listings by their sale id '''
+    return {sale_id(listing): listing for listing in listings.values()}
+
+class ListingDiff:
+    """ Difference between two listing snapshots of the same query.
+
+    Attributes:
+        added --- listings that were not in the previous snapshot
+        removed --- listings that were sold or cancelled
+        changed --- (old, new) pairs of listings whose price changed
+        initial --- True if there was no previous snapshot to compare to
+    """
+
+    def __init__(self, added: List[Listing], removed: List[Listing],
+                 changed: List[Tuple[Listing, Listing]],
+                 initial: bool = False) -> None:
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.initial = initial
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def lines(self) -> List[str]:
+        ''' Render the diff as one compact line per change '''
+        lines = [f"+ {_line(lis)}" for lis in self.added]
+        lines.extend(f"~ {_line(new)} (was {old['price']})"
+                     for old, new in self.changed)
+        lines.extend(f"- {lis['name']} (sold or removed)"
+                     for lis in self.removed)
+        return lines
+
+def _line(listing: Listing) -> str:
+    return f"[{listing['name']}]({listing['link']}) " + \
+           f"{listing['price']} {listing['token_symbol']}"
+
+def diff_listings(old: Dict[int, Listing],
+                  new: Dict[int, Listing]) -> ListingDiff:
+    ''' Compare two sale-id keyed snapshots '''
+    added = [lis for key, lis in new.items() if key not in old]
+    removed = [lis for key, lis in old.items() if key not in new]
+    changed = [(old[key], lis) for key, lis in new.items()
+               if key in old and old[key]["price"] != lis["price"]]
+    return ListingDiff(added, removed, changed)
+
+class ChangeFeed:
+    """ Keeps the last snapshot of every watched query.
+
+    ``update`` is called by pollers and returns what changed since the
+    previous poll. ``since_view`` compares against the snapshot a user
+    saw the last time, so commands can show only the changes. The views
+    of at most ``cache_size`` users and queries are kept, the least
+    recently used are forgotten first.
+    """
+
+    def __init__(self, cache_size: int = 256) -> None:
+        self.cache_size = cache_size
+        self._snapshots: Dict[str, Dict[int, Listing]] = {}
+        self._views: "OrderedDict[Tuple[str, int], Dict[int, Listing]]" = \
+            OrderedDict()
+
+    def update(self, query: str, listings: Dict[Any, Listing]
+               ) -> ListingDiff:
+        new = keyed(listings)
+        if (old := self._snapshots.get(query)) is None:
+            diff = ListingDiff(list(new.values()), [], [], initial=True)
+        else:
+            diff = diff_listings(old, new)
+        self._snapshots[query] = new
+        return diff
+
+    def since_view(self, query: str, user_id: int,
+                   listings: Dict[Any, Listing]) -> ListingDiff:
+        new = keyed(listings)
+        if (old := self._views.get((query, user_id))) is None:
+            diff = ListingDiff(list(new.values()), [], [], initial=True)
+        else:
+            diff = diff_listings(old, new)
+        self._views[(query, user_id)] = new
+        self._views.move_to_end((query, user_id))
+        while len(self._views) > self.cache_size:
+            self._views.popitem(last=False)
+        return diff
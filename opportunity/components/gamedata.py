@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Optional
+)
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+class GameData:
+    """ Picks up rebuilt game data without a restart.
+
+    scripts/build_data.py writes a manifest.json next to the JSON files
+    with a version, the hash of every file and the recipes and categories
+    it changed. The manifest is polled and on a new version only the
+    files whose hash changed are reloaded into ``bot.data`` and only the
+    recipe lists of changed categories are dropped from the cache.
+    """
+
+    def __init__(self, bot, folder: str, database: str,
+                 interval: int = 1) -> None:
+        self.bot: Bot = bot
+        self.folder = folder
+        self.database = database
+        self.logger = logging.getLogger("opportunity." + __name__)
+        manifest = self._manifest() or {}
+        self.version: int = manifest.get("version", 0)
+        self.files: Dict[str, str] = manifest.get("files", {})
+        # category -> {recipe id: recipe name}
+        self._recipes: Dict[str, Dict[str, str]] = {}
+        self.bot.scheduler.add_job(
+            self.check,
+            "interval",
+            minutes=interval,
+            id="gamedata",
+            replace_existing=True,
+            jobstore="memory")
+
+    def recipes(self, category: str) -> Dict[str, str]:
+        ''' Return {recipe id: name} of a category, cached until changed '''
+        if (recipes := self._recipes.get(category)) is None:
+            con = sqlite3.connect(self.database)
+            recipes = dict(con.execute(
+                "SELECT recipe_id, name FROM category_recipes " +
+                "WHERE category=?", (category,)).fetchall())
+            con.close()
+            self._recipes[category] = recipes
+        return recipes
+
+    async def check(self) -> None:
+        manifest = self._manifest()
+        if not manifest or manifest.get("version", 0) <= self.version:
+            return
+        files: Dict[str, str] = manifest.get("files", {})
+        changed = [name for name, digest in files.items()
+                   if self.files.get(name) != digest]
+        loop = asyncio.get_running_loop()
+        for name in changed:
+            data = await loop.run_in_executor(None, self._read, name)
+            if data is not None:
+                self.bot.data[name[:-5]] = data
+        if manifest["version"] == self.version + 1:
+            categories = manifest.get("categories", {})
+            for key in ("added", "updated", "deleted"):
+                for category in categories.get(key, []):
+                    self._recipes.pop(category, None)
+        else:
+            # missed a build, its category changes are unknown
+            self._recipes.clear()
+        self.logger.info(f"Game data version {self.version} -> " +
+                         f"{manifest['version']}, reloaded " +
+                         f"{', '.join(changed) or 'no files'}")
+        self.version = manifest["version"]
+        self.files = files
+
+    def _manifest(self) -> Optional[Dict[str, Any]]:
+        return self._read("manifest.json")
+
+    def _read(self, name: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.folder, name)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.error(f"Error reading file {path}: {e}")
+            return None
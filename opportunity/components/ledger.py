@@ -0,0 +1,122 @@
+import logging
+import sqlite3
+import time
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Tuple
+)
+
+class NotificationLedger:
+    """ Remembers which sales have already been notified.
+
+    The sqlite table is keyed by ``sale_id`` and read once on start, so
+    lookups are served from memory. Entries older than ``retention_days``
+    are pruned from both the table and memory.
+
+    A ``scoped`` ledger is keyed by ``(scope, sale_id)`` instead, so the
+    same sale can be notified once per scope, e.g. per watched region.
+    """
+
+    prune_interval = 3600  # seconds between two prunes
+
+    def __init__(self, database: str, table: str,
+                 retention_days: int = 30, scoped: bool = False) -> None:
+        self.database = database
+        self.table = table
+        self.scoped = scoped
+        self.key = "scope, sale_id" if scoped else "sale_id"
+        self.retention = retention_days * 86400
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self._last_prune = 0.0
+        con = sqlite3.connect(self.database)
+        self._migrate(con)
+        cur = con.cursor()
+        cur.execute(f"SELECT {self.key}, notified_at FROM {self.table}")
+        self._seen: Dict[Any, int] = {
+            tuple(row[:-1]) if scoped else row[0]: row[-1]
+            for row in cur.fetchall()}
+        con.close()
+        self.logger.info(f"Loaded {len(self._seen)} notified " +
+                         f"sale(s) from {self.table}")
+
+    def _migrate(self, con: sqlite3.Connection) -> None:
+        ''' Create the table, converting the old unkeyed layout '''
+        cur = con.cursor()
+        columns = [row[1] for row in
+                   cur.execute(f"PRAGMA table_info({self.table})")]
+        if columns and "notified_at" not in columns:
+            self.logger.info(f"Migrating {self.table} to keyed layout")
+            cur.execute(f"ALTER TABLE {self.table} " +
+                        f"RENAME TO {self.table}_old")
+        if self.scoped:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {self.table}(" +
+                        f"scope INTEGER NOT NULL, sale_id INTEGER NOT NULL, " +
+                        f"name TEXT, notified_at INTEGER NOT NULL, " +
+                        f"PRIMARY KEY(scope, sale_id))")
+        else:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {self.table}(" +
+                        f"sale_id INTEGER PRIMARY KEY, name TEXT, " +
+                        f"notified_at INTEGER NOT NULL)")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS " +
+                    f"ix_{self.table}_notified_at " +
+                    f"ON {self.table}(notified_at)")
+        if columns and "notified_at" not in columns:
+            cur.execute(f"INSERT OR IGNORE INTO {self.table} " +
+                        f"SELECT sale_id, name, ? FROM {self.table}_old",
+                        (int(time.time()),))
+            cur.execute(f"DROP TABLE {self.table}_old")
+        con.commit()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add_many(self, sales: Iterable[Tuple[Any, str]]) -> None:
+        ''' Record (key, name) pairs as notified in one transaction '''
+        now = int(time.time())
+        sales = list(sales)
+        if not sales:
+            return
+        rows = [(*key, name, now) if self.scoped else (key, name, now)
+                for key, name in sales]
+        con = sqlite3.connect(self.database)
+        with con:
+            con.executemany(f"INSERT OR REPLACE INTO {self.table}" +
+                            f"({self.key}, name, notified_at) " +
+                            f"VALUES({', '.join('?' * len(rows[0]))})",
+                            rows)
+        con.close()
+        for key, _ in sales:
+            self._seen[key] = now
+
+    def forget_scope(self, scope: int) -> None:
+        ''' Forget every sale notified for a scope of a scoped ledger '''
+        con = sqlite3.connect(self.database)
+        with con:
+            con.execute(f"DELETE FROM {self.table} WHERE scope=?", (scope,))
+        con.close()
+        self._seen = {k: v for k, v in self._seen.items() if k[0] != scope}
+
+    def prune(self, force: bool = False) -> None:
+        ''' Forget sales notified before the retention period '''
+        now = time.time()
+        if not force and now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        cutoff = int(now - self.retention)
+        con = sqlite3.connect(self.database)
+        with con:
+            deleted = con.execute(
+                f"DELETE FROM {self.table} WHERE notified_at < ?",
+                (cutoff,)).rowcount
+        con.close()
+        if deleted:
+            self._seen = {k: v for k, v in self._seen.items()
+                          if v >= cutoff}
+            self.logger.info(f"Pruned {deleted} sale(s) from {self.table}")
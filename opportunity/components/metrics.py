@@ -0,0 +1,172 @@
+import bisect
+import logging
+import threading
+
+from aiohttp import web
+
+# Annotation imports
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class Counter:
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+class Histogram:
+    """ Cumulative bucket histogram in the style of Prometheus. """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        ''' Estimate a quantile by linear interpolation inside a bucket '''
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.max
+
+class MetricsRegistry:
+    """ Process wide collection of counters and histograms.
+
+    Metrics are created on first use and identified by their name and
+    labels, e.g. ``registry.histogram("job_lag_seconds", job="dtmalert")``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[Labels, Counter]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def describe(self, name: str, text: str) -> None:
+        self._help[name] = text
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._counters.setdefault(name, {})
+            if key not in family:
+                family[key] = Counter()
+            return family[key]
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._histograms.setdefault(name, {})
+            if key not in family:
+                family[key] = Histogram()
+            return family[key]
+
+    def counters(self, name: str) -> Dict[Labels, Counter]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def histograms(self, name: str) -> Dict[Labels, Histogram]:
+        with self._lock:
+            return dict(self._histograms.get(name, {}))
+
+    def render(self) -> str:
+        ''' Render all metrics in the Prometheus text exposition format '''
+        lines: List[str] = []
+        with self._lock:
+            counters = {k: dict(v) for k, v in self._counters.items()}
+            histograms = {k: dict(v) for k, v in self._histograms.items()}
+        for name, family in sorted(counters.items()):
+            self._header(lines, name, "counter")
+            for labels, counter in family.items():
+                lines.append(f"{name}{_fmt(labels)} {counter.value}")
+        for name, hfamily in sorted(histograms.items()):
+            self._header(lines, name, "histogram")
+            for labels, hist in hfamily.items():
+                cumulative = 0
+                for i, count in enumerate(hist.counts):
+                    cumulative += count
+                    le = str(hist.buckets[i]) if i < len(hist.buckets) \
+                        else "+Inf"
+                    lines.append(f"{name}_bucket" +
+                                 f"{_fmt(labels + (('le', le),))} " +
+                                 f"{cumulative}")
+                lines.append(f"{name}_sum{_fmt(labels)} {hist.sum}")
+                lines.append(f"{name}_count{_fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+def _fmt(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+class MetricsServer:
+    """ Serves a MetricsRegistry on ``http://<host>:<port>/metrics``. """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1",
+                 port: int = 9100) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError:
+            await runner.cleanup()
+            raise
+        self._runner = runner
+        self.logger.info(f"Serving metrics on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(),
+                            content_type="text/plain")
@@ -0,0 +1,193 @@
+import datetime as dt
+import gc
+import json
+import logging
+import os
+from os.path import dirname as up
+import sys
+import tracemalloc
+
+import discord
+import psutil
+import requests_cache
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+root_path = up(up(os.path.abspath(__file__)))
+CONTAINERS = (dict, list, tuple, set, frozenset)
+# allocations of the profiler itself
+IGNORED = (tracemalloc.__file__, "<frozen importlib._bootstrap>",
+           "<frozen importlib._bootstrap_external>", "<unknown>")
+
+def approx_size(obj: Any) -> int:
+    '''
+    Bytes of obj and the containers and values it holds
+
+    Only containers are followed, other objects count with their own
+    size, so caches holding e.g. the bot are not charged for all of it.
+    '''
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, CONTAINERS):
+            stack.extend(current)
+    return size
+
+class MemoryProfiler:
+    """ Memory diagnostics of the running bot.
+
+    Snapshots are taken with tracemalloc, which is started on the first
+    snapshot (or at startup with OPP_TRACEMALLOC) because tracing slows
+    down every allocation. ``census`` counts live views, cogs and the
+    bot's caches without tracemalloc. ``sample`` appends a line of both
+    to ``path`` on a schedule.
+    """
+
+    def __init__(self, bot, path: str, frames: int = 0) -> None:
+        self.bot: Bot = bot
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self.frames = frames or 10
+        self.snapshots: List[tracemalloc.Snapshot] = []  # last two
+        self.path = path
+        self.sampling = 0  # minutes between samples, 0 if not sampling
+        if frames:
+            tracemalloc.start(frames)
+
+    def snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        '''
+        Take a snapshot, keeping the previous one for diff
+
+        Returns:
+            None if tracing was only started now
+        '''
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.logger.info(f"Started tracemalloc with {self.frames} " +
+                             "frames")
+            return None
+        snapshot = self._take()
+        self.snapshots = self.snapshots[-1:] + [snapshot]
+        return snapshot
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in IGNORED])
+
+    def top(self, amount: int) -> List[tracemalloc.Statistic]:
+        if not self.snapshots:
+            return []
+        return self.snapshots[-1].statistics("lineno")[:amount]
+
+    def diff(self, amount: int) -> List[tracemalloc.StatisticDiff]:
+        ''' Top allocators by growth between the last two snapshots '''
+        if len(self.snapshots) < 2:
+            return []
+        return self.snapshots[1].compare_to(
+            self.snapshots[0], "lineno")[:amount]
+
+    def caches(self) -> Dict[str, Any]:
+        ''' The long lived containers of the bot, by name '''
+        bot = self.bot
+        caches = {f"data.{key}": value for key, value in bot.data.items()}
+        caches.update({
+            "snapshots": bot.snapshots._snapshots,
+            "snapshot views": bot.snapshots._views,
+            "feed": bot.feed._snapshots,
+            "feed views": bot.feed._views,
+            "renderer pages": bot.renderer._pages,
+            "traces": bot.tracer.traces,
+            "recipe lists": bot.gamedata._recipes,
+        })
+        return caches
+
+    def census(self) -> Dict[str, Any]:
+        '''
+        Count views, cogs and caches with their approximate sizes
+
+        Walks every object tracked by gc on the event loop, so the
+        caches do not change while they are measured.
+        '''
+        objects = gc.get_objects()
+        views = [obj for obj in objects if isinstance(obj, discord.ui.View)]
+        result: Dict[str, Any] = {
+            "rss": psutil.Process().memory_info().rss,
+            "gc objects": len(objects),
+            "gc counts": gc.get_count(),
+            "views": len(views),
+            "view items": sum(len(view.children) for view in views),
+            "persistent views": len(self.bot.persistent_views),
+            "cogs": {name: approx_size(vars(cog))
+                     for name, cog in self.bot.cogs.items()},
+            "caches": {name: (len(value) if hasattr(value, "__len__")
+                              else 0, approx_size(value))
+                       for name, value in self.caches().items()}
+        }
+        if tracemalloc.is_tracing():
+            result["traced"] = tracemalloc.get_traced_memory()
+        if (cache := requests_cache.get_cache()) is not None:
+            path = getattr(cache.responses, "db_path", "")
+            result["requests cache"] = (
+                len(cache.responses),
+                os.path.getsize(path) if path and os.path.isfile(path)
+                else 0)
+        return result
+
+    def start_sampling(self, minutes: int) -> None:
+        ''' Sample every minutes until stopped '''
+        self.sampling = minutes
+        self.bot.scheduler.add_job(
+            self.sample,
+            "interval",
+            minutes=minutes,
+            id="memory_sample",
+            replace_existing=True,
+            jobstore="memory")
+
+    def stop_sampling(self) -> None:
+        if self.sampling:
+            self.bot.scheduler.remove_job("memory_sample", "memory")
+            self.sampling = 0
+
+    async def sample(self) -> None:
+        '''
+        Append the census as a JSON line
+
+        The top allocators are added while tracemalloc is on. Samples
+        neither start it nor replace the snapshots used for diff.
+        '''
+        line: Dict[str, Any] = {
+            "time": dt.datetime.now().isoformat(timespec="seconds"),
+            **self.census()}
+        if tracemalloc.is_tracing():
+            line["top"] = [statistic(stat) for stat in
+                           self._take().statistics("lineno")[:10]]
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line) + "\n")
+
+def statistic(stat: Any) -> Tuple[str, int, int]:
+    ''' Location, size and count of a tracemalloc statistic '''
+    frame = stat.traceback[0]
+    filename = os.path.relpath(frame.filename, root_path) if \
+        frame.filename.startswith(root_path) else frame.filename
+    return (f"{filename}:{frame.lineno}", stat.size, stat.count)
@@ -0,0 +1,217 @@
+import json
+import math
+import sqlite3
+
+import numpy as np
+
+# Annotation imports
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+from utils import PlotCoords
+
+Point = Tuple[float, float]  # (latitude, longitude)
+
+class Region:
+    """ A named polygon on a quadrangle, watched for cheap plots.
+
+    A box is stored as its four corners. Boxes only need the bounding
+    box test, other polygons are checked by ray casting.
+    """
+
+    def __init__(self, id: int, guild_id: int, channel_id: int, name: str,
+                 quadrangle: str, polygon: List[Point],
+                 threshold: int) -> None:
+        self.id = id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.name = name
+        self.quadrangle = quadrangle
+        self.polygon = polygon
+        self.threshold = threshold
+        lats = [p[0] for p in polygon]
+        lons = [p[1] for p in polygon]
+        self.bbox = (min(lats), min(lons), max(lats), max(lons))
+        self.is_box = set(polygon) == {
+            (lat, lon) for lat in (self.bbox[0], self.bbox[2])
+            for lon in (self.bbox[1], self.bbox[3])}
+
+    @staticmethod
+    def parse_points(points: str) -> List[Point]:
+        '''
+        Parse "lat,lon;lat,lon;..." into a polygon
+
+        Two points are interpreted as opposite corners of a box.
+
+        Raises:
+            ValueError: if the string is malformed, has too few points or
+                a point outside of latitude [-90, 90], longitude [-180, 180]
+        '''
+        polygon = []
+        for pair in points.split(";"):
+            lat, lon = (float(value) for value in pair.split(","))
+            # also false for NaN
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"{pair} is not a valid latitude,longitude")
+            polygon.append((lat, lon))
+        if len(polygon) == 2:
+            (lat1, lon1), (lat2, lon2) = polygon
+            polygon = [(lat1, lon1), (lat1, lon2), (lat2, lon2), (lat2, lon1)]
+        if len(polygon) < 3:
+            raise ValueError("A region needs two corners or three points")
+        return polygon
+
+    def mask(self, coords: PlotCoords) -> np.ndarray:
+        ''' Return a mask of the lands inside the region '''
+        if self.is_box:
+            return coords.in_box(*self.bbox)
+        return coords.in_polygon(self.polygon)
+
+class RegionIndex:
+    """ Uniform grid over latitude/longitude mapping cells to regions.
+
+    A match only tests the regions registered for the cells the lands
+    are in, so the cost of matching a page stays flat as more regions
+    are added far away from its plots.
+    Regions covering more than ``max_cells`` cells are refused, as every
+    cell takes an entry.
+    """
+
+    def __init__(self, cell_size: float = 0.5,
+                 max_cells: int = 4096) -> None:
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.regions: Dict[int, Region] = {}
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size),
+                math.floor(lon / self.cell_size))
+
+    def _cells_of(self, region: Region) -> List[Tuple[int, int]]:
+        min_lat, min_lon, max_lat, max_lon = region.bbox
+        lat0, lon0 = self._cell(min_lat, min_lon)
+        lat1, lon1 = self._cell(max_lat, max_lon)
+        return [(i, j) for i in range(lat0, lat1 + 1)
+                for j in range(lon0, lon1 + 1)]
+
+    def check(self, region: Region) -> None:
+        '''
+        Raises:
+            ValueError: if a point is not finite or the region covers
+                more than max_cells cells
+        '''
+        if not all(math.isfinite(value) for point in region.polygon
+                   for value in point):
+            raise ValueError("Region points must be finite")
+        min_lat, min_lon, max_lat, max_lon = region.bbox
+        lat0, lon0 = self._cell(min_lat, min_lon)
+        lat1, lon1 = self._cell(max_lat, max_lon)
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) > self.max_cells:
+            raise ValueError("A region may span at most " +
+                             f"{self.max_cells * self.cell_size ** 2:g} " +
+                             "square degrees")
+
+    def add(self, region: Region) -> None:
+        '''
+        Raises:
+            ValueError: see check
+        '''
+        self.check(region)
+        self.regions[region.id] = region
+        for cell in self._cells_of(region):
+            self._cells.setdefault(cell, []).append(region.id)
+
+    def remove(self, region_id: int) -> None:
+        if (region := self.regions.pop(region_id, None)) is None:
+            return
+        for cell in self._cells_of(region):
+            ids = self._cells[cell]
+            ids.remove(region_id)
+            if not ids:
+                del self._cells[cell]
+
+    def match(self, coords: PlotCoords, quadrangle: Optional[str] = None
+              ) -> List[Tuple[Region, np.ndarray]]:
+        ''' Return the regions with lands of coords inside, and their mask '''
+        cells = zip(np.floor(coords.lat / self.cell_size).astype(int).tolist(),
+                    np.floor(coords.lon / self.cell_size).astype(int).tolist())
+        candidates = {region_id for cell in set(cells)
+                      for region_id in self._cells.get(cell, ())}
+        matches = []
+        for region_id in sorted(candidates):
+            region = self.regions[region_id]
+            if quadrangle is not None and region.quadrangle != quadrangle:
+                continue
+            if (mask := region.mask(coords)).any():
+                matches.append((region, mask))
+        return matches
+
+    def quadrangles(self) -> Set[str]:
+        return {region.quadrangle for region in self.regions.values()}
+
+    def guild_regions(self, guild_id: int) -> List[Region]:
+        return [region for region in self.regions.values()
+                if region.guild_id == guild_id]
+
+class RegionStore:
+    """ Persists regions in a sqlite table. """
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+        con = sqlite3.connect(self.database)
+        with con:
+            con.execute("CREATE TABLE IF NOT EXISTS regions(" +
+                        "id INTEGER PRIMARY KEY AUTOINCREMENT, " +
+                        "guild_id INTEGER NOT NULL, " +
+                        "channel_id INTEGER NOT NULL, name TEXT NOT NULL, " +
+                        "quadrangle TEXT NOT NULL, polygon TEXT NOT NULL, " +
+                        "threshold INTEGER NOT NULL, " +
+                        "UNIQUE(guild_id, name))")
+        con.close()
+
+    def load(self) -> List[Region]:
+        con = sqlite3.connect(self.database)
+        rows = con.execute("SELECT id, guild_id, channel_id, name, " +
+                           "quadrangle, polygon, threshold FROM regions")
+        regions = [Region(row[0], row[1], row[2], row[3], row[4],
+                          [(p[0], p[1]) for p in json.loads(row[5])], row[6])
+                   for row in rows]
+        con.close()
+        return regions
+
+    def add(self, guild_id: int, channel_id: int, name: str,
+            quadrangle: str, polygon: List[Point], threshold: int) -> Region:
+        '''
+        Store a new region
+
+        Raises:
+            sqlite3.IntegrityError: if the guild already has a region
+                with that name
+        '''
+        con = sqlite3.connect(self.database)
+        with con:
+            cur = con.execute("INSERT INTO regions(guild_id, channel_id, " +
+                              "name, quadrangle, polygon, threshold) " +
+                              "VALUES(?, ?, ?, ?, ?, ?)",
+                              (guild_id, channel_id, name, quadrangle,
+                               json.dumps(polygon), threshold))
+        con.close()
+        return Region(cur.lastrowid or 0, guild_id, channel_id, name,
+                      quadrangle, polygon, threshold)
+
+    def remove(self, guild_id: int, name: str) -> Optional[int]:
+        ''' Delete a region and return its id, or None if not found '''
+        con = sqlite3.connect(self.database)
+        with con:
+            row = con.execute("SELECT id FROM regions WHERE guild_id=? " +
+                              "AND name=?", (guild_id, name)).fetchone()
+            if row:
+                con.execute("DELETE FROM regions WHERE id=?", (row[0],))
+        con.close()
+        return row[0] if row else None
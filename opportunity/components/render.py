@@ -0,0 +1,161 @@
+from collections import OrderedDict
+
+import discord
+from discord.utils import MISSING
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+    Union
+)
+
+Field = Tuple[str, str, bool]  # name, value, inline
+PageKey = Tuple[str, int, str]  # query, page, layout
+CachedPage = Tuple[Tuple[Any, ...], List[List[Field]]]  # fingerprint, embeds
+
+class Row:
+    """ Formatted strings of one listing, computed once. """
+
+    __slots__ = ("name", "link", "cost", "land")
+
+    def __init__(self, listing: Dict[str, Any]) -> None:
+        self.name = str(listing["name"])
+        self.link = f"[Link]({listing['link']})"
+        self.cost = f"{listing['price']} {listing['token_symbol']}"
+        land = listing["land"]
+        if isinstance(land, dict):
+            # get_listings flattens the rarity, custom listings do not
+            self.land = land.get("rarity") or \
+                land.get("data", {}).get("rarity", "-")
+        else:
+            self.land = "Bundle"
+
+class ListingRenderer:
+    """ Renders listing tables into embed fields.
+
+    Rendered pages are kept in an LRU cache keyed by (query, page,
+    layout) and reused while the listings on the page are unchanged.
+    Output is split over as many fields and embeds as Discord's 25
+    field and 1024 character field limits need, and the embeds over as
+    many messages as the 6000 character and 10 embed message limits
+    need.
+    """
+
+    max_fields = 25
+    max_value = 1024
+    max_embed = 5000  # 6000 minus room for title and description
+    max_message = 6000  # characters over all embeds of a message
+    max_embeds = 10
+    columns = ("Listings", "Cost", "Land(s)")
+
+    def __init__(self, cache_size: int = 256) -> None:
+        self.cache_size = cache_size
+        self._pages: "OrderedDict[PageKey, CachedPage]" = OrderedDict()
+
+    @staticmethod
+    def layout(interaction: discord.Interaction) -> str:
+        if interaction.guild:
+            member = interaction.guild.get_member(interaction.user.id)
+            if isinstance(member, discord.Member) and member.is_on_mobile():
+                return "mobile"
+        return "desktop"
+
+    def render(self, interaction: discord.Interaction, em_msg: discord.Embed,
+               query: str, page: int,
+               listings: Dict[Union[str, int], Any]
+               ) -> List[List[discord.Embed]]:
+        '''
+        Add the listing fields to em_msg
+
+        Returns:
+            the embeds of each message to send, em_msg first, followed by
+            continuation embeds if the listings do not fit into one
+        '''
+        chunks = self.fields(query, page, self.layout(interaction), listings)
+        embeds = [em_msg]
+        for i, chunk in enumerate(chunks):
+            if i:
+                embeds.append(discord.Embed(color=em_msg.color))
+            for name, value, inline in chunk:
+                embeds[-1].add_field(name=name, value=value, inline=inline)
+        messages: List[List[discord.Embed]] = [[]]
+        size = 0
+        for embed in embeds:
+            if messages[-1] and (size + len(embed) > self.max_message or
+                                 len(messages[-1]) >= self.max_embeds):
+                messages.append([])
+                size = 0
+            messages[-1].append(embed)
+            size += len(embed)
+        return messages
+
+    def fields(self, query: str, page: int, layout: str,
+               listings: Dict[Union[str, int], Any]) -> List[List[Field]]:
+        ''' Return the fields of every embed, cached per page '''
+        key = (query, page, layout)
+        fingerprint = tuple((lis["link"], lis["price"])
+                            for lis in listings.values())
+        if (cached := self._pages.get(key)) and cached[0] == fingerprint:
+            self._pages.move_to_end(key)
+            return cached[1]
+        rows = [Row(lis) for lis in listings.values()]
+        if layout == "mobile":
+            fields = [(row.name, "\n".join([row.link, row.cost, row.land]),
+                       False) for row in rows]
+            chunks = self._chunks(fields, 1)
+        else:
+            chunks = self._chunks(self._columns(rows), 3)
+        self._pages[key] = (fingerprint, chunks)
+        if len(self._pages) > self.cache_size:
+            self._pages.popitem(last=False)
+        return chunks
+
+    def _chunks(self, fields: List[Field],
+                group: int) -> List[List[Field]]:
+        ''' Distribute groups of fields over embeds within the limits '''
+        chunks: List[List[Field]] = [[]]
+        size = 0
+        for i in range(0, len(fields), group):
+            part = fields[i:i+group]
+            length = sum(len(name) + len(value) for name, value, _ in part)
+            if chunks[-1] and (len(chunks[-1]) + group > self.max_fields or
+                               size + length > self.max_embed):
+                chunks.append([])
+                size = 0
+            chunks[-1].extend(part)
+            size += length
+        return chunks
+
+    def _columns(self, rows: List[Row]) -> List[Field]:
+        ''' Three inline columns, continued in new fields at 1024 chars '''
+        fields: List[Field] = []
+        start = 0
+        while start < len(rows):
+            end = start
+            sizes = [0, 0, 0]
+            while end < len(rows):
+                cells = (rows[end].link, rows[end].cost, rows[end].land)
+                new = [size + len(cell) + (1 if end > start else 0)
+                       for size, cell in zip(sizes, cells)]
+                if end > start and max(new) > self.max_value:
+                    break
+                sizes = new
+                end += 1
+            chunk = rows[start:end]
+            names = self.columns if not start else ("\u200b",) * 3
+            fields.append((names[0], "\n".join(r.link for r in chunk), True))
+            fields.append((names[1], "\n".join(r.cost for r in chunk), True))
+            fields.append((names[2], "\n".join(r.land for r in chunk), True))
+            start = end
+        return fields
+
+async def send(interaction: discord.Interaction,
+               messages: List[List[discord.Embed]],
+               view: Any = MISSING) -> None:
+    ''' Send rendered messages as follow-ups, the view on the last one '''
+    for i, embeds in enumerate(messages):
+        await interaction.followup.send(
+            embeds=embeds, view=view if i == len(messages) - 1 else MISSING)
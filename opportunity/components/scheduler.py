@@ -1,38 +1,468 @@
+import os
+import pickle
+import threading
+import time
+import datetime as dt
+from collections import OrderedDict
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_ERROR,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_MAX_INSTANCES,
+    JobExecutionEvent,
+    JobSubmissionEvent
+)
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.job import Job
+from apscheduler.util import datetime_to_utc_timestamp
+
+from sqlalchemy import BigInteger, Column, Index, inspect, select, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 import tzlocal
 
+from components.metrics import MetricsRegistry
+
 # Annotation imports
 from typing import (
+    Any,
     Optional,
-    List
+    Dict,
+    List,
+    Set,
+    Tuple
 )
 
+class UserJobStore(SQLAlchemyJobStore):
+    """ SQLAlchemyJobStore with an indexed ``user_id`` column.
+
+    The user id is taken from ``job.kwargs["user"]`` on every insert and
+    update, so reminders of a single user can be selected without
+    unpickling every job in the table.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.jobs_t.append_column(Column('user_id', BigInteger))
+        self.user_index = Index(
+            f"ix_{self.jobs_t.name}_user_id", self.jobs_t.c.user_id)
+
+    def start(self, scheduler, alias) -> None:
+        super().start(scheduler, alias)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        ''' Add the user_id column to tables created by older versions '''
+        columns = [c["name"] for c in inspect(self.engine).get_columns(
+            self.jobs_t.name, schema=self.jobs_t.schema)]
+        if "user_id" in columns:
+            return
+        self._logger.info("Adding user_id column to %s", self.jobs_t.name)
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                f"ALTER TABLE {self.jobs_t.fullname} " +
+                f"ADD COLUMN user_id BIGINT NULL"))
+        self.user_index.create(self.engine, checkfirst=True)
+        for job in self._get_jobs():
+            self.update_job(job)
+
+    def _user_of(self, job: Job) -> Optional[int]:
+        user = job.kwargs.get("user")
+        return int(user) if user is not None else None
+
+    def add_job(self, job: Job) -> None:
+        insert = self.jobs_t.insert().values(**{
+            'id': job.id,
+            'next_run_time': datetime_to_utc_timestamp(job.next_run_time),
+            'job_state': pickle.dumps(job.__getstate__(),
+                                      self.pickle_protocol),
+            'user_id': self._user_of(job)
+        })
+        with self.engine.begin() as connection:
+            try:
+                connection.execute(insert)
+            except IntegrityError:
+                raise ConflictingIdError(job.id)
+
+    def update_job(self, job: Job) -> None:
+        update = self.jobs_t.update().values(**{
+            'next_run_time': datetime_to_utc_timestamp(job.next_run_time),
+            'job_state': pickle.dumps(job.__getstate__(),
+                                      self.pickle_protocol),
+            'user_id': self._user_of(job)
+        }).where(self.jobs_t.c.id == job.id)
+        with self.engine.begin() as connection:
+            result = connection.execute(update)
+            if result.rowcount == 0:
+                raise JobLookupError(job.id)
+
+    def get_user_jobs(self, user: int) -> List[Job]:
+        ''' Return the jobs of a user, ordered by next run time '''
+        return self._get_jobs(self.jobs_t.c.user_id == user)
+
+    def get_states(self) -> List[Tuple[str, bytes]]:
+        ''' Return the raw (id, job_state) rows without unpickling them '''
+        selectable = select(self.jobs_t.c.id, self.jobs_t.c.job_state)
+        with self.engine.begin() as connection:
+            return [(row.id, row.job_state)
+                    for row in connection.execute(selectable)]
+
+    def put_state(self, job_id: str, next_run_time: Optional[float],
+                  job_state: bytes, user: Optional[int]) -> None:
+        ''' Insert or update an already pickled job state '''
+        values = {
+            'next_run_time': next_run_time,
+            'job_state': job_state,
+            'user_id': user
+        }
+        update = self.jobs_t.update().values(**values).where(
+            self.jobs_t.c.id == job_id)
+        with self.engine.begin() as connection:
+            if connection.execute(update).rowcount == 0:
+                connection.execute(
+                    self.jobs_t.insert().values(id=job_id, **values))
+
+    def delete_state(self, job_id: str) -> None:
+        ''' Delete a job, ignoring jobs that are already gone '''
+        delete = self.jobs_t.delete().where(self.jobs_t.c.id == job_id)
+        with self.engine.begin() as connection:
+            connection.execute(delete)
+
+
+# (op, job id, next run time, user id, pickled job state)
+LogRecord = Tuple[str, str, Optional[float], Optional[int], Optional[bytes]]
+
+class WriteBehindJobStore(MemoryJobStore):
+    """ Memory job store backed by a local log and a UserJobStore.
+
+    Jobs are served from memory. Every change is appended to a local log
+    right away and written to the backing database by a background
+    thread, so adding a reminder never waits for MariaDB. While the
+    database is unreachable changes stay in the log and are flushed
+    once the connection comes back.
+    """
+
+    def __init__(self, backing: UserJobStore, log_path: str,
+                 flush_interval: float = 5.0,
+                 metrics: Optional[MetricsRegistry] = None) -> None:
+        super().__init__()
+        self.backing = backing
+        self.metrics = metrics or MetricsRegistry()
+        self.log_path = log_path
+        self.flush_interval = flush_interval
+        self.connected = False
+        self._warned = False
+        self._user_index: Dict[int, Set[str]] = {}
+        self._pending: "OrderedDict[str, LogRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, scheduler, alias) -> None:
+        super().start(scheduler, alias)
+        records: Dict[str, LogRecord] = {}
+        for record in self._read_log():
+            records[record[1]] = record
+        for job_id, record in records.items():
+            self._pending[job_id] = record
+            if record[0] == "put" and record[4] is not None:
+                self._restore(record[4])
+        self._connect()
+        self._thread = threading.Thread(
+            target=self._run, name="jobstore-flush", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self._flush()
+        self.backing.shutdown()
+        # drop the jobs from memory without logging them as removed
+        super().remove_all_jobs()
+        self._user_index.clear()
+
+    def add_job(self, job: Job) -> None:
+        super().add_job(job)
+        self._index(job)
+        self._record("put", job)
+
+    def update_job(self, job: Job) -> None:
+        super().update_job(job)
+        self._index(job)
+        self._record("put", job)
+
+    def remove_job(self, job_id: str) -> None:
+        job = self.lookup_job(job_id)
+        super().remove_job(job_id)
+        self._unindex(job)
+        self._append(("del", job_id, None, None, None))
+
+    def remove_all_jobs(self) -> None:
+        for job in self.get_all_jobs():
+            self.remove_job(job.id)
+
+    def get_user_jobs(self, user: int) -> List[Job]:
+        ''' Return the jobs of a user, ordered by next run time '''
+        jobs = [job for job_id in self._user_index.get(user, ())
+                if (job := self.lookup_job(job_id))]
+        jobs.sort(key=lambda job: (job.next_run_time is None,
+                                   job.next_run_time))
+        return jobs
+
+    def _index(self, job: Job) -> None:
+        if (user := job.kwargs.get("user")) is not None:
+            self._user_index.setdefault(int(user), set()).add(job.id)
+
+    def _unindex(self, job: Optional[Job]) -> None:
+        if job and (user := job.kwargs.get("user")) is not None:
+            ids = self._user_index.get(int(user), set())
+            ids.discard(job.id)
+            if not ids:
+                self._user_index.pop(int(user), None)
+
+    def _record(self, op: str, job: Job) -> None:
+        user = job.kwargs.get("user")
+        self._append((
+            op,
+            job.id,
+            datetime_to_utc_timestamp(job.next_run_time),
+            int(user) if user is not None else None,
+            pickle.dumps(job.__getstate__(), self.backing.pickle_protocol)))
+
+    def _append(self, record: LogRecord) -> None:
+        with self._lock:
+            with open(self.log_path, "ab") as f:
+                pickle.dump(record, f)
+            self._pending[record[1]] = record
+            self._pending.move_to_end(record[1])
+        self._wakeup.set()
+
+    def _read_log(self) -> List[LogRecord]:
+        records: List[LogRecord] = []
+        if not os.path.isfile(self.log_path):
+            return records
+        with open(self.log_path, "rb") as f:
+            while True:
+                try:
+                    records.append(pickle.load(f))
+                except EOFError:
+                    break
+                except Exception as e:
+                    # a partially written record can only be the last one
+                    self._logger.error(f"Truncated job log: {e}")
+                    break
+        return records
+
+    def _restore(self, job_state: bytes) -> None:
+        state = pickle.loads(job_state)
+        state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        if self.lookup_job(job.id):
+            super().update_job(job)
+        else:
+            super().add_job(job)
+        self._index(job)
+
+    def _connect(self) -> bool:
+        ''' Start the backing store and merge the jobs stored in it '''
+        try:
+            start = time.perf_counter()
+            self.backing.start(self._scheduler, self._alias)
+            states = self.backing.get_states()
+            self.metrics.histogram(
+                "scheduler_jobstore_query_seconds", op="load").observe(
+                time.perf_counter() - start)
+        except SQLAlchemyError as e:
+            if not self._warned:
+                self._logger.warning(f"Job database unavailable: {e}")
+                self._warned = True
+            return False
+        with self._scheduler._jobstores_lock:
+            with self._lock:
+                pending = set(self._pending.keys())
+            for job_id, job_state in states:
+                if job_id in pending:
+                    continue  # local changes win
+                try:
+                    self._restore(job_state)
+                except Exception:
+                    self._logger.exception(
+                        f"Unable to restore job '{job_id}'")
+        self.connected = True
+        self._warned = False
+        self._logger.info(f"Job database connected, {len(states)} job(s) " +
+                          f"loaded, {len(pending)} pending change(s)")
+        if self._scheduler.running:
+            self._scheduler.wakeup()
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self.connected and not self._connect():
+                continue
+            self._flush()
+
+    def _flush(self) -> None:
+        ''' Write pending changes to the database, keeping them on error '''
+        with self._lock:
+            ops = self._pending
+            self._pending = OrderedDict()
+        if not ops:
+            return
+        start = time.perf_counter()
+        try:
+            for record in list(ops.values()):
+                op, job_id, next_run_time, user, job_state = record
+                if op == "put" and job_state is not None:
+                    self.backing.put_state(
+                        job_id, next_run_time, job_state, user)
+                else:
+                    self.backing.delete_state(job_id)
+                del ops[job_id]
+        except SQLAlchemyError as e:
+            self._logger.warning(f"Could not flush {len(ops)} job " +
+                                 f"change(s), retrying later: {e}")
+            self.connected = False
+            with self._lock:
+                for job_id, record in self._pending.items():
+                    ops[job_id] = record
+                    ops.move_to_end(job_id)
+                self._pending = ops
+            return
+        self.metrics.histogram(
+            "scheduler_jobstore_query_seconds", op="flush").observe(
+            time.perf_counter() - start)
+        with self._lock:
+            if not self._pending:
+                # everything in the log is stored in the database now
+                open(self.log_path, "wb").close()
+
 class Scheduler(AsyncIOScheduler):
+    """ AsyncIOScheduler storing reminders in MariaDB.
 
-    def __init__(self, mysql_creds: str, database: str) -> None:
+    Job events are recorded in ``self.metrics``. Jobs of the memory store
+    are labelled by their id, reminders share the label ``reminder``.
+    """
+
+    def __init__(self, mysql_creds: str, database: str,
+                 log_path: str = "jobstore.log",
+                 metrics: Optional[MetricsRegistry] = None) -> None:
         url = f"mariadb+pymysql://{mysql_creds}/{database}?charset=utf8mb4"
+        self.metrics = metrics or MetricsRegistry()
         self.js = {
-            'default': SQLAlchemyJobStore(
-                url=url,
-                engine_options={"pool_pre_ping": True, "pool_recycle": 300}),
+            'default': WriteBehindJobStore(
+                UserJobStore(
+                    url=url,
+                    engine_options={"pool_pre_ping": True,
+                                    "pool_recycle": 300}),
+                log_path,
+                metrics=self.metrics),
             'memory': MemoryJobStore()}
         super().__init__(
             jobstores=self.js,
             timezone=str(tzlocal.get_localzone()),
             job_defaults={"misfire_grace_time": None})
+        # (job id, scheduled run time) -> perf_counter at submission
+        self._started: Dict[Tuple[str, dt.datetime], float] = {}
+        # job id -> runs submitted but not finished
+        self._running: Dict[str, int] = {}
+        self.metrics.describe(
+            "scheduler_job_lag_seconds",
+            "Delay between scheduled and actual job submission")
+        self.metrics.describe(
+            "scheduler_job_duration_seconds", "Job execution time")
+        self.metrics.describe(
+            "scheduler_job_misfire_seconds",
+            "Lateness of job runs that were skipped as misfired")
+        self.metrics.describe(
+            "scheduler_jobstore_query_seconds", "Job store query time")
+        self.add_listener(self._on_submitted, EVENT_JOB_SUBMITTED)
+        self.add_listener(self._on_executed,
+                          EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+        self.add_listener(self._on_missed, EVENT_JOB_MISSED)
+        self.add_listener(self._on_max_instances, EVENT_JOB_MAX_INSTANCES)
+
+    def _job_label(self, job_id: str, jobstore: str) -> str:
+        return job_id if jobstore == "memory" else "reminder"
+
+    def _on_submitted(self, event: JobSubmissionEvent) -> None:
+        label = self._job_label(event.job_id, event.jobstore)
+        now = dt.datetime.now(self.timezone)
+        # by id, reminders sharing a label do not overlap each other
+        if self._running.get(event.job_id):
+            self.metrics.counter("scheduler_job_overlaps_total",
+                                 job=label).inc()
+        for run_time in event.scheduled_run_times:
+            self.metrics.histogram("scheduler_job_lag_seconds",
+                                   job=label).observe(
+                max((now - run_time).total_seconds(), 0.0))
+            self._started[(event.job_id, run_time)] = time.perf_counter()
+            self._running[event.job_id] = \
+                self._running.get(event.job_id, 0) + 1
+
+    def _on_executed(self, event: JobExecutionEvent) -> None:
+        label = self._job_label(event.job_id, event.jobstore)
+        started = self._started.pop(
+            (event.job_id, event.scheduled_run_time), None)
+        if started is not None:
+            self.metrics.histogram("scheduler_job_duration_seconds",
+                                   job=label).observe(
+                time.perf_counter() - started)
+            if (running := self._running.get(event.job_id, 1) - 1) > 0:
+                self._running[event.job_id] = running
+            else:
+                self._running.pop(event.job_id, None)
+        outcome = "error" if event.exception else "success"
+        self.metrics.counter("scheduler_job_runs_total",
+                             job=label, outcome=outcome).inc()
+
+    def _on_missed(self, event: JobExecutionEvent) -> None:
+        label = self._job_label(event.job_id, event.jobstore)
+        late = dt.datetime.now(self.timezone) - event.scheduled_run_time
+        self.metrics.histogram("scheduler_job_misfire_seconds",
+                               job=label).observe(late.total_seconds())
+        self.metrics.counter("scheduler_job_misfires_total",
+                             job=label).inc()
+
+    def _on_max_instances(self, event: JobSubmissionEvent) -> None:
+        label = self._job_label(event.job_id, event.jobstore)
+        self.metrics.counter("scheduler_job_max_instances_total",
+                             job=label).inc()
+
+    def _process_jobs(self):
+        start = time.perf_counter()
+        try:
+            return super()._process_jobs()
+        finally:
+            self.metrics.histogram("scheduler_jobstore_query_seconds",
+                                   op="wakeup").observe(
+                time.perf_counter() - start)
 
     def get_user_jobs(self, user: int, string: bool = False
                       ) -> Optional[List[Job]]:
-        jobs = self.get_jobs('default')
-        user_jobs = []
+        start = time.perf_counter()
+        with self._jobstores_lock:
+            jobs = self.js['default'].get_user_jobs(user)
+        self.metrics.histogram("scheduler_jobstore_query_seconds",
+                               op="get_user_jobs").observe(
+            time.perf_counter() - start)
+        user_jobs: List[Any] = []
         for job in jobs:
-            if user == job.kwargs["user"]:
-                if string:
-                    user_jobs.append(str(job))
-                else:
-                    user_jobs.append(job)
+            if string:
+                user_jobs.append(str(job))
+            else:
+                user_jobs.append(job)
         return user_jobs
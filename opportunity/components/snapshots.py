@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+
+# Annotation imports
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Tuple
+)
+
+from components.commandmetrics import upstream
+
+if TYPE_CHECKING:
+    from opportunity.opportunity import Bot
+
+Listings = Optional[Dict[int, Any]]
+
+class Snapshot:
+    """ Listings fetched from one URL at a point in time. """
+
+    def __init__(self, listings: Listings, fetched_at: float) -> None:
+        self.listings = listings
+        self.fetched_at = fetched_at
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+class SnapshotService:
+    """ Shares marketplace listing fetches between pollers and commands.
+
+    Scheduled polls call ``refresh`` and store the result, commands call
+    ``get`` and are answered from memory while the snapshot is younger
+    than ``max_age``. Concurrent refreshes of the same URL are coalesced
+    into a single upstream request.
+
+    Snapshots older than ``max_age`` are never served again and are
+    dropped with their views whenever a new snapshot is stored. At most
+    ``cache_size`` snapshots and views are kept, the least recently used
+    are evicted first.
+    """
+
+    def __init__(self, bot, max_age: float = 60.0,
+                 cache_size: int = 256) -> None:
+        self.bot: Bot = bot
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self._snapshots: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # (url, view name) -> (snapshot the view was derived from, view)
+        self._views: "OrderedDict[Tuple[str, str], Tuple[Snapshot, Any]]" = \
+            OrderedDict()
+        self.bot.metrics.describe(
+            "snapshot_requests_total",
+            "Listing snapshot reads by result (hit, miss, coalesced)")
+
+    async def refresh(self, url: str) -> Listings:
+        ''' Fetch the URL, or join a fetch of it that is in flight '''
+        return (await self._fetch(url)).listings
+
+    async def _fetch(self, url: str) -> Snapshot:
+        if (future := self._inflight.get(url)) is not None:
+            self._count("coalesced")
+            with upstream():
+                return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            # run in the caller's context so the request is attributed
+            # to its command and trace
+            context = contextvars.copy_context()
+            listings = await asyncio.get_running_loop().run_in_executor(
+                None, context.run, self.bot.api.get_custom_listings, url)
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception as retrieved if nobody joined the fetch
+            future.exception()
+            raise
+        else:
+            snapshot = Snapshot(listings, time.monotonic())
+            self._snapshots[url] = snapshot
+            self._snapshots.move_to_end(url)
+            self.prune()
+            future.set_result(snapshot)
+            return snapshot
+        finally:
+            del self._inflight[url]
+
+    async def get(self, url: str, max_age: Optional[float] = None
+                  ) -> Listings:
+        ''' Return listings no older than max_age, refreshing if needed '''
+        return (await self._fresh(url, max_age)).listings
+
+    async def view(self, url: str, name: str,
+                   derive: Callable[[Dict[int, Any]], Any],
+                   max_age: Optional[float] = None) -> Any:
+        '''
+        Return a derived view of the listings, memoized per snapshot
+
+        ``derive`` is given a shallow copy of the listings, so filters
+        that delete entries (like get_dtm_listings) are safe. The
+        returned view is shared and must not be modified.
+        '''
+        snapshot = await self._fresh(url, max_age)
+        if snapshot.listings is None:
+            return None
+        memo = self._views.get((url, name))
+        if memo is not None and memo[0] is snapshot:
+            self._views.move_to_end((url, name))
+            return memo[1]
+        view = derive(dict(snapshot.listings))
+        self._views[(url, name)] = (snapshot, view)
+        self._views.move_to_end((url, name))
+        while len(self._views) > self.cache_size:
+            self._views.popitem(last=False)
+        return view
+
+    def prune(self) -> None:
+        ''' Drop stale snapshots and views, then evict down to size '''
+        for url in [url for url, snapshot in self._snapshots.items()
+                    if snapshot.age > self.max_age]:
+            del self._snapshots[url]
+        while len(self._snapshots) > self.cache_size:
+            self._snapshots.popitem(last=False)
+        for key in [key for key, (snapshot, _) in self._views.items()
+                    if self._snapshots.get(key[0]) is not snapshot]:
+            del self._views[key]
+
+    async def _fresh(self, url: str, max_age: Optional[float]) -> Snapshot:
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self._snapshots.get(url)
+        if snapshot is not None and snapshot.age <= max_age:
+            self._count("hit")
+            self._snapshots.move_to_end(url)
+            return snapshot
+        if url not in self._inflight:
+            self._count("miss")
+        return await self._fetch(url)
+
+    def _count(self, result: str) -> None:
+        self.bot.metrics.counter("snapshot_requests_total",
+                                 result=result).inc()
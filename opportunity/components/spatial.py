@@ -0,0 +1,167 @@
+import heapq
+import math
+
+import numpy as np
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+MARS_RADIUS = 3389.5  # km
+
+def to_xyz(lat: Any, lon: Any) -> np.ndarray:
+    ''' Convert degrees to points on the unit sphere, shape (..., 3) '''
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon),
+                     np.cos(lat) * np.sin(lon),
+                     np.sin(lat)], axis=-1)
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    ''' Great-circle distance on Mars in km '''
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * \
+        math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * MARS_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+class _Node:
+    __slots__ = ("axis", "split", "left", "right", "idx")
+
+    def __init__(self) -> None:
+        self.axis = 0
+        self.split = 0.0
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.idx: Optional[np.ndarray] = None  # set on leaves
+
+class KDTree:
+    """ Static k-d tree over points on the unit sphere.
+
+    Euclidean (chord) distance between unit vectors grows monotonically
+    with great-circle distance, so nearest neighbours by chord are the
+    nearest neighbours on the sphere.
+    """
+
+    leaf_size = 16
+
+    def __init__(self, points: np.ndarray, keys: List[Any]) -> None:
+        self.points = points
+        self.keys = keys
+        self.root = self._build(np.arange(len(keys)))
+
+    def _build(self, idx: np.ndarray) -> _Node:
+        node = _Node()
+        if len(idx) <= self.leaf_size:
+            node.idx = idx
+            return node
+        pts = self.points[idx]
+        node.axis = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        order = idx[np.argsort(pts[:, node.axis], kind="stable")]
+        mid = len(order) // 2
+        node.split = float(self.points[order[mid], node.axis])
+        node.left = self._build(order[:mid])
+        node.right = self._build(order[mid:])
+        return node
+
+    def query(self, point: np.ndarray, k: int,
+              dead: Set[int]) -> List[Tuple[float, int]]:
+        ''' Return (squared chord, index) of the k nearest live points '''
+        heap: List[Tuple[float, int]] = []  # max-heap on distance
+
+        def visit(node: _Node) -> None:
+            if node.idx is not None:
+                dist = ((self.points[node.idx] - point) ** 2).sum(axis=1)
+                for d, i in zip(dist.tolist(), node.idx.tolist()):
+                    if i in dead:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, i))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, i))
+                return
+            diff = point[node.axis] - node.split
+            near, far = (node.left, node.right) if diff < 0 \
+                else (node.right, node.left)
+            visit(near)  # type: ignore
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)  # type: ignore
+
+        if k > 0 and self.keys:
+            visit(self.root)
+        return sorted((-d, i) for d, i in heap)
+
+class SpatialIndex:
+    """ Nearest-neighbour index over (latitude, longitude) points.
+
+    Inserts go to a small buffer that is searched by brute force and
+    removals are tombstoned in the tree. Once the buffer and tombstones
+    exceed ``rebuild_ratio`` of the index, the tree is rebuilt, so a
+    stream of small listing changes stays cheap.
+    """
+
+    def __init__(self, rebuild_ratio: float = 0.25,
+                 min_pending: int = 64) -> None:
+        self.rebuild_ratio = rebuild_ratio
+        self.min_pending = min_pending
+        self.items: Dict[Any, Tuple[float, float, Any]] = {}
+        self._tree = KDTree(np.empty((0, 3)), [])
+        self._positions: Dict[Any, int] = {}  # key -> index in tree
+        self._dead: Set[int] = set()
+        self._buffer: Dict[Any, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def insert(self, key: Any, lat: float, lon: float, item: Any) -> None:
+        self.remove(key)
+        self.items[key] = (lat, lon, item)
+        self._buffer[key] = to_xyz(lat, lon)
+        self._maybe_rebuild()
+
+    def remove(self, key: Any) -> None:
+        if self.items.pop(key, None) is None:
+            return
+        if self._buffer.pop(key, None) is None:
+            self._dead.add(self._positions.pop(key))
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self) -> None:
+        pending = len(self._buffer) + len(self._dead)
+        if pending > max(self.min_pending,
+                         self.rebuild_ratio * len(self.items)):
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        keys = list(self.items)
+        coords = np.array([self.items[key][:2] for key in keys],
+                          dtype=np.float64).reshape(-1, 2)
+        self._tree = KDTree(to_xyz(coords[:, 0], coords[:, 1]), keys)
+        self._positions = {key: i for i, key in enumerate(keys)}
+        self._dead = set()
+        self._buffer = {}
+
+    def nearest(self, lat: float, lon: float,
+                k: int) -> List[Tuple[float, Any, Any]]:
+        ''' Return (distance in km, key, item) of the k nearest points '''
+        point = to_xyz(lat, lon)
+        found = [(d, self._tree.keys[i])
+                 for d, i in self._tree.query(point, k, self._dead)]
+        if self._buffer:
+            keys = list(self._buffer)
+            dist = ((np.stack([self._buffer[key] for key in keys]) -
+                     point) ** 2).sum(axis=1)
+            found.extend(zip(dist.tolist(), keys))
+        found.sort(key=lambda pair: pair[0])
+        result = []
+        for _, key in found[:k]:
+            item_lat, item_lon, item = self.items[key]
+            result.append((haversine(lat, lon, item_lat, item_lon),
+                           key, item))
+        return result
@@ -0,0 +1,122 @@
+import contextvars
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+# Annotation imports
+from typing import (
+    Deque,
+    Iterator,
+    List,
+    Optional
+)
+
+from components.metrics import MetricsRegistry
+
+class Span:
+    """ One upstream request.
+
+    Attributes:
+        endpoint --- host and path of the request, ids replaced by :id
+        start --- seconds from the start of the trace
+        cache --- "hit" or "miss" of the requests cache, "off" if the
+            response did not pass through it
+    """
+
+    __slots__ = ("endpoint", "start", "duration", "status", "size",
+                 "cache", "error")
+
+    def __init__(self, endpoint: str, start: float) -> None:
+        self.endpoint = endpoint
+        self.start = start
+        self.duration = 0.0
+        self.status = 0
+        self.size = 0
+        self.cache = "off"
+        self.error = ""
+
+    def response(self, r: requests.Response) -> None:
+        self.status = r.status_code
+        self.size = len(r.content)
+        if hasattr(r, "from_cache"):
+            self.cache = "hit" if r.from_cache else "miss"
+
+class Trace:
+    """ Upstream requests made while handling one interaction. """
+
+    def __init__(self, name: str, interaction_id: int) -> None:
+        self.name = name
+        self.interaction_id = interaction_id
+        self.created = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+
+
+current_trace: contextvars.ContextVar[Optional[Trace]] = \
+    contextvars.ContextVar("current_trace", default=None)
+
+def endpoint(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.netloc + re.sub(r"/\d+(?=/|$)", "/:id", parts.path)
+
+class Tracer:
+    """ Keeps the traces of the last ``size`` interactions.
+
+    Requests made outside of an interaction, e.g. by scheduled jobs,
+    are not kept, but like all requests they are counted in the
+    ``upstream_request_seconds`` metric.
+    """
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None,
+                 size: int = 256) -> None:
+        self.metrics = metrics
+        self.traces: Deque[Trace] = deque(maxlen=size)
+        if self.metrics:
+            self.metrics.describe(
+                "upstream_request_seconds",
+                "Upstream API request time by endpoint and cache outcome")
+            self.metrics.describe(
+                "upstream_requests_total",
+                "Upstream API requests by endpoint, status and cache outcome")
+
+    def start(self, name: str, interaction_id: int) -> Trace:
+        ''' Start a trace, current for the calling task from now on '''
+        trace = Trace(name, interaction_id)
+        current_trace.set(trace)
+        return trace
+
+    def finish(self, trace: Trace) -> None:
+        trace.duration = time.perf_counter() - trace.started
+        self.traces.append(trace)
+
+    @contextmanager
+    def span(self, url: str) -> Iterator[Span]:
+        ''' Time a request and add it to the current trace '''
+        trace = current_trace.get()
+        start = time.perf_counter()
+        span = Span(endpoint(url), start - trace.started if trace else 0.0)
+        try:
+            yield span
+        except Exception as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            if trace:
+                trace.spans.append(span)
+            if self.metrics:
+                self.metrics.histogram(
+                    "upstream_request_seconds", endpoint=span.endpoint,
+                    cache=span.cache).observe(span.duration)
+                self.metrics.counter(
+                    "upstream_requests_total", endpoint=span.endpoint,
+                    status=str(span.status or span.error),
+                    cache=span.cache).inc()
+
+    def slowest(self, amount: int) -> List[Trace]:
+        return sorted(self.traces, key=lambda t: -t.duration)[:amount]
@@ -1,16 +1,19 @@
-import discord
+import re
 
-from components.api import API
-import configparser
+import discord
 
 # Annotation imports
 from typing import (
     TYPE_CHECKING,
+    Any,
     Dict,
-    Union,
-    Any
+    Optional,
+    Tuple
 )
 
+from utils import Color
+from components.render import send
+
 if TYPE_CHECKING:
     from opportunity.opportunity import Bot
 
@@ -33,128 +36,94 @@ class Confirm(discord.ui.View):
         self.value = False
         self.stop()
 
-class Listings(discord.ui.View):
-    def __init__(self, building: str, page: int = 1):
-        super().__init__()
+class MoreListings(discord.ui.DynamicItem[discord.ui.Button],
+                   template=r"more:(?P<name>[\w\-]+):(?P<rarity>[A-Z]):" +
+                            r"(?P<level>\d+):(?P<page>\d+):" +
+                            r"(?P<amount>\d+):(?P<all>[01])"):
+    """ "More results" button of a listing search.
+
+    The whole search state lives in the custom_id, so the button keeps
+    working after restarts and is handled without the original view.
+    Registered with ``Bot.add_dynamic_items`` at startup.
+    """
+
+    def __init__(self, name: str, rarity: str, level: int, page: int,
+                 amount: int = 1, all_levels: bool = False) -> None:
+        self.name = name
+        self.rarity = rarity
+        self.level = level
         self.page = page
-        self.building = building
-
-    @discord.ui.button(label="More results", style=discord.ButtonStyle.green)
-    async def more(self, interaction: discord.Interaction,
-                   button: discord.ui.Button) -> None:
-        config = configparser.ConfigParser()
-        config.read("config.cfg")
-        api = API(url=config["yourls"]["url"],
-                  secret=config["yourls"]["secret"])
+        self.amount = amount
+        self.all_levels = all_levels
+        super().__init__(discord.ui.Button(
+            label="More results",
+            style=discord.ButtonStyle.green,
+            custom_id=f"more:{name}:{rarity}:{level}:{page}:{amount}:" +
+                      f"{int(all_levels)}"))
+
+    @property
+    def building(self) -> str:
+        return f"{self.name}_{self.rarity}{self.level}"
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction,
+                             item: discord.ui.Item[Any],
+                             match: re.Match[str]) -> "MoreListings":
+        return cls(match["name"], match["rarity"], int(match["level"]),
+                   int(match["page"]), int(match["amount"]),
+                   match["all"] == "1")
+
+    def as_view(self) -> discord.ui.View:
+        view = discord.ui.View(timeout=None)
+        view.add_item(self)
+        return view
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        bot: Bot = interaction.client  # type: ignore
         await interaction.response.defer(thinking=True)
-        self.page += 1
-        listings = api.get_listings(self.building, self.page)
-        if listings:
-            em_msg = discord.Embed(
-                title="Listings",
-                description=f"Listings containing {self.building} " +
-                            f"(page {self.page})",
-                color=0x00ff00)
-
-            _build_listings_embed(interaction, em_msg, listings)
-            listing_view = Listings(self.building, self.page)
-            await interaction.followup.send(embed=em_msg,
-                                            view=listing_view)
-        else:
-            em_msg = discord.Embed(title="Listings", color=0xff0000)
+        found = await next_listings(bot, self.name, self.rarity, self.level,
+                                    self.page + 1, self.amount,
+                                    self.all_levels)
+        if not found:
+            em_msg = discord.Embed(title="Listings", color=Color.RED)
             em_msg.add_field(
                 name="Listings",
-                value=f"No more listings found. (page {self.page})",
+                value=f"No more listings found. (page {self.page + 1})",
                 inline=False)
             await interaction.followup.send(embed=em_msg)
-        self.stop()
-
-class AllLevelListings(discord.ui.View):
-    def __init__(self, bot, building: str, level: int, page: int = 1):
-        super().__init__()
-        self.bot: Bot = bot
-        self.page = page
-        self.building = building
-        self.level = level
-        self.maxLevel = self.bot.data["maxLevel"]
-
-    @discord.ui.button(label="More results", style=discord.ButtonStyle.green)
-    async def more(self, interaction: discord.Interaction,
-                   button: discord.ui.Button) -> None:
-        await interaction.response.defer(thinking=True)
-        building_name: str = self.building.rsplit("_", 1)[0]
-        rarity: str = self.building.rsplit("_", 1)[1][0]
-        self.page += 1
-        listings = self.bot.api.get_listings(self.building, self.page)
-        while not listings:
-            if self.level < int(self.maxLevel[building_name][rarity]):
-                self.page = 1
-                self.building = self.building.replace(
-                    rarity + str(self.level),
-                    rarity + str(self.level+1))
-                self.level += 1
-                listings = self.bot.api.get_listings(self.building, self.page)
-            else:
-                em_msg = discord.Embed(title="Listings", color=0xff0000)
-                em_msg.add_field(
-                    name="Listings",
-                    value=f"No more listings found.",
-                    inline=False)
-                await interaction.followup.send(embed=em_msg)
-                return
+            return
+        level, page, listings = found
+        more = MoreListings(self.name, self.rarity, level, page,
+                            self.amount, self.all_levels)
+        description = f"Listings containing {more.building} " + \
+                      f"(level {level}, page {page})" if self.all_levels \
+            else f"Listings containing {more.building} (page {page})"
         em_msg = discord.Embed(
             title="Listings",
-            description=f"Listings containing {self.building} " +
-                        f"(level {self.level}, page {self.page})",
-            color=0x00ff00)
-
-        _build_listings_embed(interaction, em_msg, listings)
-        listing_view = AllLevelListings(self.bot, self.building,
-                                        self.level, self.page)
-        await interaction.followup.send(embed=em_msg,
-                                        view=listing_view)
-        self.stop()
+            description=description,
+            color=Color.GREEN)
+        await send(interaction, bot.renderer.render(
+            interaction, em_msg, more.building, page, listings),
+            more.as_view())
 
-def _build_listings_embed(
-    interaction: discord.Interaction,
-    em_msg: discord.Embed,
-    listings: Dict[Union[str, int], Any]
-) -> None:
-    mobile: bool = False
-    if interaction.guild:
-        user = interaction.guild.get_member(interaction.user.id)
-        if isinstance(user, discord.Member):
-            mobile = user.is_on_mobile()
-    if mobile:
-        for item in listings:
-            em_msg.add_field(
-                name=f"{listings[item]['name']}",
-                value="\n".join([
-                    f"[Link]({listings[item]['link']})",
-                    f"{listings[item]['price']} " +
-                    f"{listings[item]['token_symbol']}",
-                    listings[item]["land"]["rarity"]
-                    if isinstance(listings[item]["land"], dict)
-                    else "Bundle"])
-            )
-    else:
-        em_msg.add_field(
-            name="Listings",
-            value="\n".join([
-                f"[Link]({listings[item]['link']})"
-                for item in listings.keys()]),
-            inline=True)
-        em_msg.add_field(
-            name="Cost",
-            value="\n".join([
-                str(listings[item]["price"]) +
-                " " + listings[item]["token_symbol"]
-                for item in listings.keys()]),
-            inline=True)
-        em_msg.add_field(
-            name="Land(s)",
-            value="\n".join([
-                listings[item]["land"]["rarity"]
-                if isinstance(listings[item]["land"], dict)
-                else "Bundle" for item in listings.keys()]),
-            inline=True)
+async def next_listings(bot: "Bot", name: str, rarity: str, level: int,
+                        page: int, amount: int = 1, all_levels: bool = False
+                        ) -> Optional[Tuple[int, int, Dict[int, Any]]]:
+    '''
+    Fetch a page of listings through the snapshot cache
+
+    With all_levels, an exhausted level continues on page 1 of the next
+    level up to the building's maximum level.
+
+    Returns:
+        None or (level, page, listings) of the first non-empty page
+    '''
+    max_level = int(bot.data["maxLevel"].get(name, {}).get(rarity, level))
+    while True:
+        url = bot.api.listings_url(f"{name}_{rarity}{level}", page, amount)
+        if listings := await bot.snapshots.get(url):
+            return level, page, listings
+        if not all_levels or level >= max_level:
+            return None
+        level += 1
+        page = 1
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+from os.path import dirname as up
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+
+# Annotation imports
+from typing import (
+    Optional,
+    Tuple
+)
+
+from components.metrics import MetricsRegistry
+
+root_path = up(up(os.path.abspath(__file__)))
+asyncio_path = up(asyncio.__file__)
+
+class LoopWatchdog:
+    """ Detects callbacks that block the event loop.
+
+    A heartbeat task on the loop notes the time every ``interval``
+    seconds. A thread checks the heartbeat, and once it is older than
+    ``threshold`` the loop thread's stack is captured while the blocking
+    callback is still running. The stall is logged and counted under
+    the command or scheduler job found in the stack's frames.
+    """
+
+    def __init__(self, metrics: MetricsRegistry, threshold: float = 0.5,
+                 interval: float = 0.1) -> None:
+        self.metrics = metrics
+        self.threshold = threshold
+        self.interval = interval
+        self.logger = logging.getLogger("opportunity." + __name__)
+        self._beat = time.monotonic()
+        self._loop_thread = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self.metrics.describe(
+            "loop_lag_seconds",
+            "How late the watchdog heartbeat woke up on the event loop")
+        self.metrics.describe(
+            "loop_stalls_total",
+            "Callbacks that blocked the event loop past the threshold")
+        self.metrics.describe(
+            "loop_stall_seconds",
+            "How long blocking callbacks held the event loop")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        ''' Start watching the running loop '''
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(
+            self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog",
+                         daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.metrics.histogram("loop_lag_seconds").observe(
+                max(now - expected, 0.0))
+            self._beat = now
+
+    def _watch(self) -> None:
+        stall: Optional[Tuple[str, float]] = None  # source, last beat
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if stall is None and blocked > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                source = self.source(frame)
+                stall = (source, beat)
+                # the loop's own frames are the same for every stall
+                stack = [entry for entry in traceback.extract_stack(frame)
+                         if not entry.filename.startswith(asyncio_path)]
+                self.logger.warning(
+                    f"Event loop blocked for {blocked:.2f}s by {source}:\n" +
+                    "".join(traceback.format_list(stack)))
+            elif stall and beat != stall[1]:
+                duration = max(beat - stall[1] - self.interval, 0.0)
+                self.metrics.counter("loop_stalls_total",
+                                     source=stall[0]).inc()
+                self.metrics.histogram("loop_stall_seconds",
+                                       source=stall[0]).observe(duration)
+                self.logger.info(f"Event loop resumed after {duration:.2f}s " +
+                                 f"blocked by {stall[0]}")
+                stall = None
+
+    @staticmethod
+    def source(frame: FrameType) -> str:
+        '''
+        Name what a stack is running
+
+        Returns:
+            "command <name>" or "job <id>" if a frame has the interaction
+            or scheduler job in its locals, otherwise the innermost frame
+            of the bot's own code
+        '''
+        location = ""
+        current: Optional[FrameType] = frame
+        while current is not None:
+            try:
+                local = current.f_locals
+            except Exception:
+                local = {}
+            interaction = local.get("interaction")
+            if command := getattr(interaction, "command", None):
+                return f"command {command.qualified_name}"
+            job = local.get("job")
+            if current.f_code.co_name == "run_coroutine_job" and \
+                    (job_id := getattr(job, "id", None)) is not None:
+                # ids of reminder jobs are random, see Scheduler._job_label
+                return "job " + (job_id if local.get("jobstore_alias") ==
+                                 "memory" else "reminder")
+            filename = current.f_code.co_filename
+            if not location and filename.startswith(root_path):
+                location = f"{os.path.relpath(filename, root_path)}:" + \
+                           f"{current.f_lineno} {current.f_code.co_name}"
+            current = current.f_back
+        return location or f"{os.path.basename(frame.f_code.co_filename)}:" + \
+            f"{frame.f_lineno} {frame.f_code.co_name}"
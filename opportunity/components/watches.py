@@ -0,0 +1,136 @@
+import re
+import sqlite3
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+from utils import listing_lands
+
+building_key = re.compile(r"^(.+)_([CURELMS])(10|[1-9])$")
+
+class Watch:
+    """ A user's subscription to listings of a building and rarity. """
+
+    def __init__(self, id: int, user_id: int, channel_id: Optional[int],
+                 building: str, rarity: str, level: Optional[int],
+                 max_price: int, token_symbol: Optional[str]) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.channel_id = channel_id  # None for direct messages
+        self.building = building
+        self.rarity = rarity
+        self.level = level
+        self.max_price = max_price
+        self.token_symbol = token_symbol
+
+    def __str__(self) -> str:
+        token = f" {self.token_symbol}" if self.token_symbol else ""
+        return f"{self.building}_{self.rarity}{self.level or '*'} " + \
+               f"≤ {self.max_price}{token}"
+
+    def accepts(self, level: int, price: int, token_symbol: str) -> bool:
+        return (self.level is None or self.level == level) and \
+            price <= self.max_price and \
+            (self.token_symbol is None or self.token_symbol == token_symbol)
+
+class WatchIndex:
+    """ Inverted index from (building, rarity) to subscriptions.
+
+    A listing is matched by looking up the buildings on its plots, so
+    one pass over new listings evaluates every subscription.
+    """
+
+    def __init__(self) -> None:
+        self.watches: Dict[int, Watch] = {}
+        self._index: Dict[Tuple[str, str], List[Watch]] = {}
+
+    def add(self, watch: Watch) -> None:
+        self.watches[watch.id] = watch
+        self._index.setdefault((watch.building, watch.rarity),
+                               []).append(watch)
+
+    def remove(self, watch_id: int) -> None:
+        if (watch := self.watches.pop(watch_id, None)) is None:
+            return
+        key = (watch.building, watch.rarity)
+        self._index[key].remove(watch)
+        if not self._index[key]:
+            del self._index[key]
+
+    def user_watches(self, user_id: int) -> List[Watch]:
+        return [watch for watch in self.watches.values()
+                if watch.user_id == user_id]
+
+    def match(self, listing: Dict[str, Any]) -> List[Watch]:
+        ''' Return the subscriptions a custom listing satisfies '''
+        price = int(listing["price"])
+        symbol = listing["token_symbol"]
+        matched: Dict[int, Watch] = {}
+        for land in listing_lands(listing):
+            for key, amount in land.get("mutable_data", {}).items():
+                if not (m := building_key.match(key)):
+                    continue
+                try:
+                    if not int(amount):
+                        continue
+                except (TypeError, ValueError):
+                    continue
+                for watch in self._index.get((m[1], m[2]), ()):
+                    if watch.accepts(int(m[3]), price, symbol):
+                        matched[watch.id] = watch
+        return list(matched.values())
+
+class WatchStore:
+    """ Persists price watches in a sqlite table. """
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+        con = sqlite3.connect(self.database)
+        with con:
+            con.execute("CREATE TABLE IF NOT EXISTS price_watches(" +
+                        "id INTEGER PRIMARY KEY AUTOINCREMENT, " +
+                        "user_id INTEGER NOT NULL, " +
+                        "channel_id INTEGER, building TEXT NOT NULL, " +
+                        "rarity TEXT NOT NULL, level INTEGER, " +
+                        "max_price INTEGER NOT NULL, token_symbol TEXT)")
+            con.execute("CREATE INDEX IF NOT EXISTS " +
+                        "ix_price_watches_user_id ON price_watches(user_id)")
+        con.close()
+
+    def load(self) -> List[Watch]:
+        con = sqlite3.connect(self.database)
+        rows = con.execute("SELECT id, user_id, channel_id, building, " +
+                           "rarity, level, max_price, token_symbol " +
+                           "FROM price_watches")
+        watches = [Watch(*row) for row in rows]
+        con.close()
+        return watches
+
+    def add(self, user_id: int, channel_id: Optional[int], building: str,
+            rarity: str, level: Optional[int], max_price: int,
+            token_symbol: Optional[str]) -> Watch:
+        values = (user_id, channel_id, building, rarity, level, max_price,
+                  token_symbol)
+        con = sqlite3.connect(self.database)
+        with con:
+            cur = con.execute("INSERT INTO price_watches(user_id, " +
+                              "channel_id, building, rarity, level, " +
+                              "max_price, token_symbol) " +
+                              "VALUES(?, ?, ?, ?, ?, ?, ?)", values)
+        con.close()
+        return Watch(cur.lastrowid or 0, *values)
+
+    def remove(self, user_id: int, watch_id: int) -> bool:
+        con = sqlite3.connect(self.database)
+        with con:
+            deleted = con.execute("DELETE FROM price_watches WHERE id=? " +
+                                  "AND user_id=?",
+                                  (watch_id, user_id)).rowcount
+        con.close()
+        return bool(deleted)
@@ -2,7 +2,6 @@ import json
 from json.decoder import JSONDecodeError
 import os
 from os.path import dirname as up
-import string
 import requests_cache
 from sqlite3 import connect, Row
 
@@ -10,8 +9,6 @@ import datetime as dt
 import logging
 import configparser
 
-from pymysql.err import OperationalError
-
 # Annotation imports
 from typing import (
     Any,
@@ -27,9 +24,26 @@ from discord import app_commands
 
 # Custom modules
 from components.api import API
+from components.autocomplete import building_ac, recipe_ac
+from components.commandmetrics import MetricsTree, describe, record
+from components.delivery import ReminderDelivery
+from components.feed import ChangeFeed
+from components.gamedata import GameData
+from components.profiler import MemoryProfiler
+from components.metrics import MetricsRegistry, MetricsServer
+from components.render import ListingRenderer
 from components.scheduler import Scheduler
+from components.snapshots import SnapshotService
+from components.tracing import Tracer
 from components.versionhandler import VersionHandler
-from utils import id_generator, setup_logging, Color, translate_bldg
+from components.views import MoreListings
+from components.watchdog import LoopWatchdog
+from utils import (
+    id_generator,
+    setup_logging,
+    Color,
+    task_label
+)
 
 from apscheduler.job import Job
 
@@ -57,6 +71,13 @@ CACHE_TIMEOUT = env("OPP_CACHE_TIMEOUT", 300)
 GIT_LOG_LEVEL = env("OPP_GIT_LOG_LEVEL", logging.INFO)
 DISCORD_LOG_LEVEL = env("OPP_DISCORD_LOG_LEVEL", logging.INFO)
 JSON_FOLDER = env("OPP_JSON_FOLDER", "/app/data/json")
+REMINDER_WINDOW = env("OPP_REMINDER_WINDOW", 2)
+JOBSTORE_LOG = env("OPP_JOBSTORE_LOG", "/app/data/jobstore.log")
+SNAPSHOT_MAX_AGE = env("OPP_SNAPSHOT_MAX_AGE", 60)
+SNAPSHOT_CACHE_SIZE = env("OPP_SNAPSHOT_CACHE_SIZE", 256)
+GAME_DB = env("OPP_GAME_DB", "opportunity.sqlite")
+TRACEMALLOC = env("OPP_TRACEMALLOC", 0)
+MEMORY_LOG = env("OPP_MEMORY_LOG", "/app/data/memory.jsonl")
 
 class Bot(commands.Bot):
 
@@ -66,7 +87,8 @@ class Bot(commands.Bot):
         intents = discord.Intents.all()
 
         super().__init__(command_prefix=commands.when_mentioned_or('!'),
-                         intents=intents)
+                         intents=intents,
+                         tree_cls=MetricsTree)
 
         self.logger = logging.getLogger("opportunity.bot")
         log_path = os.path.join(root_path, "logs", "opportunity.log")
@@ -85,9 +107,37 @@ class Bot(commands.Bot):
 
         self.data = load_data(self)
 
+        self.metrics = MetricsRegistry()
+        describe(self.metrics)
+        self.metrics_server: Optional[MetricsServer] = None
+        if port := self.config.get("metrics", "port", fallback=""):
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                self.config.get("metrics", "host", fallback="127.0.0.1"),
+                int(port))
+
+        self.tracer = Tracer(self.metrics)
+        self.memory = MemoryProfiler(self, MEMORY_LOG, int(TRACEMALLOC))
+        self.watchdog = LoopWatchdog(
+            self.metrics,
+            float(self.config.get("watchdog", "threshold",
+                                  fallback="") or 0.5),
+            float(self.config.get("watchdog", "interval",
+                                  fallback="") or 0.1))
+
         self.scheduler: Scheduler = Scheduler(
             self.config['mariadb']['credentials'],
-            self.config['mariadb']['database'])
+            self.config['mariadb']['database'],
+            JOBSTORE_LOG,
+            self.metrics)
+
+        self.delivery = ReminderDelivery(self, float(REMINDER_WINDOW))
+        self.feed = ChangeFeed()
+        self.renderer = ListingRenderer()
+        self.add_dynamic_items(MoreListings)
+        self.snapshots = SnapshotService(self, float(SNAPSHOT_MAX_AGE),
+                                         int(SNAPSHOT_CACHE_SIZE))
+        self.gamedata = GameData(self, JSON_FOLDER, GAME_DB)
 
         self.api: API = API(self)
         self.data["clean_bldg"] = self.api.get_building_names_clean()
@@ -115,6 +165,15 @@ class Bot(commands.Bot):
 
         self.scheduler.start()
 
+        if self.metrics_server and not self.metrics_server.running:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                self.logger.error(f"Could not start metrics server: {e}")
+
+        if not self.watchdog.running:
+            self.watchdog.start()
+
         await load_cogs(self)
         await load_commands(self)
         self.emoji = await load_emojis(self)
@@ -123,6 +182,12 @@ class Bot(commands.Bot):
         # Reload help after self.extensions is populated
         await self.reload_extension("commands.help")
 
+    async def on_app_command_completion(
+            self, interaction: discord.Interaction,
+            command: Any) -> None:
+        if timing := interaction.extras.get("timing"):
+            record(self, timing, "success")
+
 
 ''' Variables '''
 
@@ -154,6 +219,8 @@ async def load_commands(bot: Bot) -> None:
 def load_data(bot: Bot) -> Dict[str, Any]:
     data = {}
     for file in os.listdir(JSON_FOLDER):
+        if not file.endswith(".json"):
+            continue
         data[file[:-5]] = read_json(bot, os.path.join(JSON_FOLDER, file))
     return data
 
@@ -200,13 +267,7 @@ async def edit_msg_to_error(msg: discord.Message, error: Any) -> None:
     await msg.edit(content=error)
 
 async def remind(user: int, channel_id: int, **kwargs):
-    channel = bot.get_channel(channel_id)
-    u: discord.User = await bot.fetch_user(user)
-    desc = f"Your **{kwargs['task_name']}** tasks are ready"
-    em_msg = discord.Embed(title="Reminders", description=desc,
-                           color=Color.GREEN)
-    if isinstance(channel, discord.TextChannel):
-        await channel.send(content=f"{u.mention}", embed=em_msg)
+    bot.delivery.enqueue(user, channel_id, task_label(kwargs))
 
 
 bot = Bot()
@@ -224,54 +285,6 @@ async def test(ctx: commands.Context):
     print(bot.scheduler.running)
     print(str(bot.scheduler.get_jobs()))
 
-async def building_ac(
-    interaction: discord.Interaction,
-    current: str,
-) -> List[app_commands.Choice[str]]:
-    building: str = interaction.namespace.building
-    choices = []
-    if bot.data["clean_bldg"]:
-        choices = bot.data["clean_bldg"]
-        if len(building) >= 1:
-            choices = [s for s in choices if building.lower() in s.lower()]
-        if len(choices) > 25:
-            choices = []
-    return [
-        app_commands.Choice(
-            name=string.capwords(building.replace("_", " ")),
-            value=building)
-        for building in choices if current.lower() in building.lower()
-    ]
-
-async def recipe_ac(
-    interaction: discord.Interaction,
-    current: str,
-) -> List[app_commands.Choice[str]]:
-    building: str = interaction.namespace.building
-    level: int = interaction.namespace.level
-    category = ""
-    building = translate_bldg(building)
-    if not category:
-        category = building + "_C" + str(level)
-    con = connect("opportunity.sqlite")
-    con.row_factory = Row
-    cur = con.cursor()
-    cur.execute("SELECT * FROM prep WHERE category=?", (category,))
-    recipes = json.loads(dict(cur.fetchone())["recipes"])
-    choices = recipes
-    r: Optional[str] = interaction.namespace.recipe
-    if len(recipes) > 25:
-        if r:
-            choices = [s for s in choices if r.lower() in s.lower()]
-        else:
-            choices = []
-        if len(choices) > 25:
-            choices = []
-    return [
-        app_commands.Choice(name=recipes[recipe]["name"], value=recipe)
-        for recipe in choices if current.lower() in recipe.lower()
-    ]
-
 @app_commands.command()
 @app_commands.autocomplete(
     building=building_ac,
@@ -280,48 +293,61 @@ async def reminder(
     interaction: discord.Interaction,
     building: str,
     level: app_commands.Range[int, 1, 10],
-    recipe: str
+    recipe: str,
+    amount: app_commands.Range[int, 1, 100] = 1,
+    cycles: app_commands.Range[int, 0, 1000] = 1
 ) -> None:
     await interaction.response.defer(thinking=True)
-    con = connect("opportunity.sqlite")
+    con = connect(GAME_DB)
     con.row_factory = Row  # set query return type to dict
     cur = con.cursor()
     cur.execute("SELECT name, durationSeconds, inputs FROM recipes WHERE id=?",
                 (recipe,))
     r = dict(cur.fetchone())
     try:
-        job_id = id_generator(8)
+        duration = int(r["durationSeconds"])
+        first_run = dt.datetime.now() + dt.timedelta(seconds=duration)
+        # A single job covers all buildings and all cycles
+        if cycles == 1:
+            trigger_args: Dict[str, Any] = {
+                "trigger": "date",
+                "next_run_time": first_run}
+        else:
+            trigger_args = {
+                "trigger": "interval",
+                "seconds": duration,
+                "start_date": first_run,
+                "end_date": first_run + dt.timedelta(
+                    seconds=duration*(cycles-1)) if cycles else None}
         for _ in range(0, 100):
             try:
                 bot.scheduler.add_job(
                     remind,
-                    id=job_id,
-                    trigger="date",
-                    next_run_time=dt.datetime.now()+dt.timedelta(
-                        seconds=int(r["durationSeconds"])),
+                    id=id_generator(8),
+                    **trigger_args,
                     kwargs={
                         "user": interaction.user.id,
                         "channel_id": interaction.channel_id,
-                        "task_name": r["name"]})
+                        "task_name": r["name"],
+                        "amount": amount})
             except ConflictingIdError as e:
                 bot.logger.error("Conflicting id in job")
-            except OperationalError as e2:
-                bot.logger.error(e2)
-                await interaction.followup.send(embed=discord.Embed(
-                    title="Error",
-                    description="Could not connect to database, " +
-                                "please try again in a few seconds",
-                    color=Color.RED
-                ))
-                return
+                continue
             break
         task_time = r["durationSeconds"]
         m, s = divmod(int(task_time), 60)
         h, m = divmod(m, 60)
         task_time = '{:0>2}:{:0>2}:{:0>2}'.format(h, m, s)
-        message = f"You will be reminded in **{task_time}** to " + \
-                  f"finish your " + \
-                  f"**{r['name']}** task(s)"
+        task = task_label({"task_name": r["name"], "amount": amount})
+        if cycles == 1:
+            message = f"You will be reminded in **{task_time}** to " + \
+                      f"finish your " + \
+                      f"**{task}** task(s)"
+        else:
+            repeat = f"{cycles} times" if cycles else "until cancelled"
+            message = f"You will be reminded every **{task_time}** " + \
+                      f"({repeat}) to finish your " + \
+                      f"**{task}** task(s)"
         em_msg = discord.Embed(
             title="Reminders",
             color=Color.GREEN,
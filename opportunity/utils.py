@@ -10,11 +10,14 @@ import random
 
 from enum import IntEnum
 
+import numpy as np
+
 # Annotation imports
 from typing import (
     Optional,
     Tuple,
     Dict,
+    List,
     Any,
     Union
 )
@@ -30,28 +33,82 @@ def abbr_to_full(abbr: str) -> str:
     }
     return full[abbr]
 
+def land_coords(land: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    ''' Return (latitude, longitude) of a land.plots asset if known '''
+    try:
+        return (float(land["immutable_data"]["latitude"]),
+                float(land["immutable_data"]["longitude"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def listing_lands(listing: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ''' Return the assets of a custom listing, bundles included '''
+    land = listing["land"]
+    return land if isinstance(land, list) else [land]
+
+class PlotCoords:
+    """ Coordinates of every land in a page of custom listings.
+
+    Latitudes and longitudes are extracted once into arrays, so box and
+    polygon tests run over all lands at once. ``keys`` and ``sale_ids``
+    hold the listing each land belongs to, bundles contribute one entry
+    per land.
+    """
+
+    def __init__(self, listings: Dict[Any, Any]) -> None:
+        keys: List[Any] = []
+        coords: List[Tuple[float, float]] = []
+        for key, listing in listings.items():
+            for land in listing_lands(listing):
+                if point := land_coords(land):
+                    keys.append(key)
+                    coords.append(point)
+        self.keys = keys
+        self.sale_ids = np.array(
+            [int(listings[key]["link"].rsplit("/", 1)[1]) for key in keys],
+            dtype=np.int64)
+        points = np.array(coords, dtype=np.float64).reshape(-1, 2)
+        self.lat = points[:, 0]
+        self.lon = points[:, 1]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def in_box(self, min_lat: float, min_lon: float, max_lat: float,
+               max_lon: float) -> np.ndarray:
+        ''' Return a mask of the lands inside the bounding box '''
+        return (self.lat >= min_lat) & (self.lat <= max_lat) & \
+            (self.lon >= min_lon) & (self.lon <= max_lon)
+
+    def in_polygon(self, polygon: List[Tuple[float, float]]) -> np.ndarray:
+        ''' Return a mask of the lands inside a (lat, lon) polygon '''
+        lats = np.array([p[0] for p in polygon])
+        lons = np.array([p[1] for p in polygon])
+        mask = self.in_box(lats.min(), lons.min(), lats.max(), lons.max())
+        inside = np.zeros_like(mask)
+        lat, lon = self.lat[mask], self.lon[mask]
+        # even-odd ray casting, one vectorized step per edge
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(len(polygon)):
+                j = i - 1
+                crosses = (lons[i] > lon) != (lons[j] > lon)
+                edge_lat = (lats[j] - lats[i]) * (lon - lons[i]) / \
+                    (lons[j] - lons[i]) + lats[i]
+                inside[mask] ^= crosses & (lat < edge_lat)
+        return inside
+
+    def matching(self, mask: np.ndarray) -> Dict[int, Any]:
+        ''' Map the sale ids with at least one land in the mask to keys '''
+        return {int(self.sale_ids[i]): self.keys[i]
+                for i in np.flatnonzero(mask)}
+
 def get_dtm_listings(listings: Dict[Any, Any]) -> Dict[Any, Any]:
-    inBundle: bool = False
-
-    def checkCoords(land):
-        try:
-            lat = land["immutable_data"]["latitude"]
-            lon = land["immutable_data"]["longitude"]
-            return (-13.7618994 >= float(lat) >= -14.0379497 and
-                    -58.8787492 >= float(lon) >= -58.9983385)
-        except KeyError:
-            return False
-    for k, v in listings.copy().items():
-        if isinstance(v["land"], dict):
-            if not checkCoords(v["land"]):
-                del listings[k]
-        elif isinstance(v["land"], list):
-            inBundle = False
-            for land in v["land"]:
-                if checkCoords(land):
-                    inBundle = True
-            if not inBundle:
-                del listings[k]
+    ''' Keep only listings with a plot on the DTM settlement '''
+    coords = PlotCoords(listings)
+    keep = set(coords.matching(coords.in_box(
+        -14.0379497, -58.9983385, -13.7618994, -58.8787492)).values())
+    for key in listings.keys() - keep:
+        del listings[key]
     return listings
 
 def translate_bldg(building: str):
@@ -193,6 +250,16 @@ def prepare_recipes(input: str, output: str) -> None:
             if recipe.rsplit("_", 1)[0] not in processed_recipes:
                 processed_recipes.append(recipe.rsplit("_", 1)[0])
 
+def task_label(kwargs: Dict[str, Any]) -> str:
+    ''' Return the task name of a reminder job, prefixed by its amount '''
+    amount = kwargs.get("amount", 1)
+    return f"{amount}x {kwargs['task_name']}" if amount > 1 \
+        else kwargs["task_name"]
+
+def format_ms(seconds: float) -> str:
+    ''' Format a duration in seconds as milliseconds '''
+    return f"{round(seconds * 1000, 1)} ms"
+
 def id_generator(size=6, chars=string.ascii_letters + string.digits) -> str:
     return ''.join(random.choice(chars) for _ in range(size))
 
@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+
+import argparse
+import asyncio
+import configparser
+import functools
+import json
+import logging
+import os
+from os.path import dirname as up
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+import discord
+import requests
+
+# Annotation imports
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional
+)
+
+if up(up(__file__)) not in sys.path:
+    sys.path.append(up(up(__file__)))
+    from opportunity.utils import setup_logging
+# the bot's modules import each other relative to its folder
+if os.path.join(up(up(__file__)), "opportunity") not in sys.path:
+    sys.path.append(os.path.join(up(up(__file__)), "opportunity"))
+
+from components.api import API
+from components.autocomplete import building_ac, recipe_ac
+from components.feed import ChangeFeed
+from components.gamedata import GameData
+from components.metrics import MetricsRegistry
+from components.render import ListingRenderer
+from components.snapshots import SnapshotService
+from components.tracing import Tracer
+from commands.dtm import DTM
+from commands.search import Search
+from commands.train import Train
+from commands.upgrade import Upgrade
+from jsonToSQLite import create_category_tables, insert_categories
+
+Case = Callable[[], Awaitable[Any]]
+
+BUILDINGS = ["solar_panel", "water_filter", "greenhouse", "smelter",
+             "chem_lab", "machine_shop", "cad", "mining_rig"]
+DTM_BOX = (-14.0379497, -58.9983385, -13.7618994, -58.8787492)
+
+class FakeUpstream:
+    """ Local stand-in for AtomicAssets, milliononmars, Alcor and CMC.
+
+    Replaces requests.get while installed. Responses are generated once
+    per URL and served from memory after ``latency`` seconds, so runs
+    measure the bot and not the network.
+    """
+
+    def __init__(self, latency: float = 0.0, listings: int = 100) -> None:
+        self.latency = latency
+        self.listings = listings
+        self.calls = 0
+        self._bodies: Dict[str, bytes] = {}
+        self._get = requests.get
+
+    def install(self) -> None:
+        requests.get = self.get  # type: ignore
+
+    def uninstall(self) -> None:
+        requests.get = self._get  # type: ignore
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        r = requests.Response()
+        r.url = url
+        if (body := self._bodies.get(url)) is None:
+            payload = self.payload(url)
+            body = json.dumps(payload).encode() if payload is not None \
+                else b""
+            self._bodies[url] = body
+        r.status_code = 200 if body else 404
+        r._content = body
+        return r
+
+    def payload(self, url: str) -> Any:
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        if parts.path.endswith("/atomicmarket/v2/sales"):
+            limit = int(query.get("limit", ["100"])[0])
+            page = int(query.get("page", ["1"])[0])
+            dtm = "immutable_data.quadrangle" in query
+            return {"data": [self.sale(page * limit + i, dtm)
+                             for i in range(min(limit, self.listings))]}
+        if parts.path.endswith("/schemas/onmars/land.plots"):
+            return {"data": {"format": [
+                {"name": f"{building}_{rarity}"} for building in BUILDINGS
+                for rarity in ("C", "U", "R", "E", "L", "M")]}}
+        if "/atomicassets/v1/assets/" in parts.path:
+            return {"data": self.asset(int(parts.path.rsplit("/", 1)[1]))}
+        if parts.path.endswith("/marketItemStats"):
+            items = [{"id": f"{building}_{rarity}{level}",
+                      "attributes": {"lastSoldPrice": 100 + level}}
+                     for building in BUILDINGS for rarity in "CURELM"
+                     for level in range(1, 11)]
+            items += [{"id": f"shard_{building}_{rarity}",
+                       "attributes": {"lastSoldPrice": 5}}
+                      for building in BUILDINGS for rarity in "CURELM"]
+            return {"data": items}
+        if parts.netloc == "wax.alcor.exchange":
+            return {"last_price": 0.0125}
+        if parts.netloc == "pro-api.coinmarketcap.com":
+            return {"data": {"2300": {"quote": {"USD": {"price": 0.045}}}}}
+        return None
+
+    def asset(self, n: int, dtm: bool = False) -> Dict[str, Any]:
+        if dtm and n % 2:
+            lat = DTM_BOX[0] + (DTM_BOX[2] - DTM_BOX[0]) * (n % 97) / 97
+            lon = DTM_BOX[1] + (DTM_BOX[3] - DTM_BOX[1]) * (n % 89) / 89
+        else:
+            lat = (n * 7919 % 180000) / 1000 - 90
+            lon = (n * 104729 % 360000) / 1000 - 180
+        return {"asset_id": str(1099500000000 + n),
+                "name": f"Plot {n}",
+                "data": {"rarity": "CURELM"[n % 6]},
+                "immutable_data": {"latitude": str(lat),
+                                   "longitude": str(lon)}}
+
+    def sale(self, n: int, dtm: bool = False) -> Dict[str, Any]:
+        assets = [self.asset(n, dtm)]
+        if n % 10 == 0:
+            assets.append(self.asset(n + 1000000, dtm))
+        return {"sale_id": str(100000000 + n),
+                "price": {"amount": str((500 + n % 5000) * 100000000),
+                          "token_symbol": "WAX"},
+                "assets": assets}
+
+class FakeResponse:
+
+    def __init__(self) -> None:
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def defer(self, **kwargs: Any) -> None:
+        self.done = True
+
+    async def send_message(self, *args: Any, **kwargs: Any) -> None:
+        self.done = True
+
+class FakeFollowup:
+
+    def __init__(self) -> None:
+        self.sent: List[Dict[str, Any]] = []
+
+    async def send(self, *args: Any, **kwargs: Any) -> None:
+        self.sent.append(kwargs)
+
+class FakeInteraction:
+    """ The parts of discord.Interaction the commands use. """
+
+    count = 0
+
+    def __init__(self, client: Any, **namespace: Any) -> None:
+        FakeInteraction.count += 1
+        self.id = FakeInteraction.count
+        self.client = client
+        self.namespace = SimpleNamespace(**namespace)
+        self.user = SimpleNamespace(id=self.id % 50)
+        self.guild = None
+        self.extras: Dict[Any, Any] = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+class BenchBot:
+    """ The parts of Bot the commands use, without Discord or MariaDB. """
+
+    def __init__(self, folder: str, max_age: float) -> None:
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({"yourls": {"url": "", "secret": ""}})
+        self.scheduler = SimpleNamespace(add_job=lambda *a, **k: None)
+        self.metrics = MetricsRegistry()
+        self.tracer = Tracer(self.metrics)
+        self.feed = ChangeFeed()
+        self.renderer = ListingRenderer()
+        self.snapshots = SnapshotService(self, max_age)
+        self.emoji: Dict[str, str] = defaultdict(str)
+        self.data: Dict[str, Any] = {
+            "maxLevel": {building: {rarity: "10" for rarity in "CURELM"}
+                         for building in BUILDINGS},
+            "buildingUpgrades": {
+                f"{building}_{rarity}{level}": {
+                    "shardsRequired": level * 2, "upgradePrice": level * 100}
+                for building in BUILDINGS for rarity in "CURELM"
+                for level in range(2, 11)}}
+        self.gamedata = GameData(self, folder,
+                                 os.path.join(folder, "opportunity.sqlite"))
+        self.api = API(self)
+        self.data["clean_bldg"] = self.api.get_building_names_clean()
+
+def game_database(path: str) -> None:
+    ''' Recipe categories for recipe_ac and /train '''
+    categories: Dict[str, Dict[str, Any]] = {
+        "training_hall_1": {
+            f"scavenging_Lv{level}": {
+                "name": f"Scavenging {level}", "durationSeconds": 60,
+                "inputs": [{"itemMatch": ["energy"], "quantity": level},
+                           {"itemMatch": ["dusk"], "quantity": level * 3}]}
+            for level in range(2, 151)}}
+    for building in ("solar", "water_filter", "greenhouse"):
+        categories[f"{building}_C1"] = {
+            f"{building}_recipe_{i}": {
+                "name": f"{building} recipe {i}", "durationSeconds": 3600,
+                "inputs": [{"itemMatch": ["energy"], "quantity": 10}]}
+            for i in range(12)}
+    con = sqlite3.connect(path)
+    with con:
+        create_category_tables(con)
+        insert_categories(con, categories.items())
+    con.close()
+
+def command(cog: Any, name: str) -> Callable[..., Awaitable[Any]]:
+    ''' The callback of an app command, bound to its cog '''
+    return functools.partial(getattr(cog, name).callback, cog)
+
+def cases(bot: BenchBot) -> Dict[str, Case]:
+    search = command(Search(bot), "search")
+    upgrade = command(Upgrade(bot), "upgrade")
+    dtm = command(DTM(bot), "dtm")
+    train = command(Train(bot), "train")
+    uncached = ListingRenderer(cache_size=0)
+    listings = bot.api.get_custom_listings(bot.api.recent_listings_url())
+    if not listings:
+        raise RuntimeError("fake upstream returned no listings")
+
+    def interaction(**namespace: Any) -> Any:
+        return FakeInteraction(bot, **namespace)
+
+    async def get_listings() -> Any:
+        return bot.api.get_listings("solar_panel_R5", 1)
+
+    async def render(renderer: ListingRenderer) -> Any:
+        return renderer.render(interaction(),
+                               discord.Embed(title="Listings"),
+                               "bench", 1, listings)  # type: ignore
+
+    return {
+        "search": lambda: search(interaction(), "Gen 1", "5", "Rare",
+                                 core="Solar Panel"),
+        "search_all_levels": lambda: search(interaction(), "Gen 1", "*",
+                                            "Epic", core="Greenhouse"),
+        "upgrade": lambda: upgrade(interaction(), "Solar Panel", "Rare",
+                                   1, 10, generation="Gen 1"),
+        "dtm": lambda: dtm(interaction()),
+        "train": lambda: train(interaction(), "Scavenging", 1, 150),
+        "building_ac": lambda: building_ac(interaction(building="s"), "s"),
+        "recipe_ac": lambda: recipe_ac(
+            interaction(building="solar_panel", level=1, recipe=""), ""),
+        "get_listings": get_listings,
+        "render": lambda: render(uncached),
+        "render_cached": lambda: render(bot.renderer),
+    }
+
+async def measure(case: Case, iterations: int,
+                  concurrency: int) -> Dict[str, float]:
+    '''
+    Returns:
+        latency percentiles of sequential runs, peak traced memory of
+        one run and the best throughput of concurrency simultaneous runs
+    '''
+    await case()  # warm up caches the way a running bot has them
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await case()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    peaks = []
+    tracemalloc.start()
+    for _ in range(max(iterations // 10, 3)):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await case()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    elapsed = float("inf")
+    for _ in range(5):  # best of, a single burst is too noisy
+        start = time.perf_counter()
+        await asyncio.gather(*(case() for _ in range(concurrency)))
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return {
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "peak_kib": statistics.median(peaks) / 1024,
+        "throughput": concurrency / elapsed
+    }
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float, min_delta: float) -> List[str]:
+    '''
+    Return a line per metric that got worse than tolerance allows
+
+    Timings must also be min_delta ms worse, so the jitter of cases
+    that take microseconds is not reported.
+    '''
+    regressions = []
+    for name, result in results.items():
+        if not (base := baseline.get(name)):
+            continue
+        # p95 is reported but too noisy on shared machines to gate on
+        for key, slack in (("p50_ms", min_delta), ("peak_kib", 0.0)):
+            if result[key] > base[key] * (1 + tolerance) + slack:
+                regressions.append(f"{name} {key}: {base[key]:.3f} -> " +
+                                   f"{result[key]:.3f}")
+        # compared as ms per invocation to apply the same slack
+        per_call = 1000 / result["throughput"]
+        base_per_call = 1000 / base["throughput"]
+        if per_call > base_per_call * (1 + tolerance) + min_delta:
+            regressions.append(f"{name} throughput: " +
+                               f"{base['throughput']:.1f} -> " +
+                               f"{result['throughput']:.1f}")
+    return regressions
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    logger = logging.getLogger("benchmark")
+    upstream = FakeUpstream(args.latency, args.listings)
+    upstream.install()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            game_database(os.path.join(folder, "opportunity.sqlite"))
+            bot = BenchBot(folder, args.max_age)
+            selected = cases(bot)
+            results = {}
+            for name, case in selected.items():
+                if args.case and name not in args.case:
+                    continue
+                calls = upstream.calls
+                results[name] = await measure(case, args.iterations,
+                                              args.concurrency)
+                logger.info(f"{name:>18}: " + "  ".join(
+                    f"{key} {value:9.3f}"
+                    for key, value in results[name].items()) +
+                    f"  upstream calls {upstream.calls - calls}")
+            return results
+    finally:
+        upstream.uninstall()
+
+def main(args, loglevel):
+    setup_logging(
+        "benchmark",
+        log_path=os.path.join(up(up(__file__)), "logs", ".log"))
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(loglevel)
+    # commands log every invocation
+    logging.getLogger("opportunity").setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    baseline: Optional[Dict[str, Any]] = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": f"{platform.platform()}, " +
+                           f"Python {platform.python_version()}",
+                "settings": {"iterations": args.iterations,
+                             "concurrency": args.concurrency,
+                             "latency": args.latency,
+                             "listings": args.listings,
+                             "max_age": args.max_age},
+                "results": results}, f, indent=4)
+        logger.info(f"Saved results to {args.save}")
+    if baseline:
+        if regressions := compare(results, baseline["results"],
+                                  args.tolerance, args.min_delta):
+            for line in regressions:
+                logger.error(f"regression: {line}")
+            sys.exit(1)
+        logger.info(f"No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Benchmark commands and autocompletes offline")
+
+    parser.add_argument(
+        "case",
+        help="cases to run, all if none are given",
+        nargs="*")
+    parser.add_argument(
+        "-n",
+        "--iterations",
+        help="sequential runs per case",
+        type=int,
+        default=200)
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        help="simultaneous runs for the throughput measurement",
+        type=int,
+        default=50)
+    parser.add_argument(
+        "--latency",
+        help="seconds the fake upstream takes per request",
+        type=float,
+        default=0.0)
+    parser.add_argument(
+        "--listings",
+        help="listings per page returned by the fake upstream",
+        type=int,
+        default=100)
+    parser.add_argument(
+        "--max-age",
+        help="snapshot max age in seconds, 0 to fetch on every run",
+        type=float,
+        default=60.0)
+    parser.add_argument(
+        "--save",
+        help="write the results to this JSON file",
+        default="")
+    parser.add_argument(
+        "--compare",
+        help="baseline JSON file to check the results against",
+        default="")
+    parser.add_argument(
+        "--tolerance",
+        help="allowed relative slowdown before a result is a regression",
+        type=float,
+        default=0.25)
+    parser.add_argument(
+        "--min-delta",
+        help="ms a timing must also get worse by to be a regression",
+        type=float,
+        default=0.1)
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="increase output verbosity",
+        action="store_true")
+    args = parser.parse_args()
+
+    loglevel = logging.DEBUG if args.verbose else logging.INFO
+
+    main(args, loglevel)
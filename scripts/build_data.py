@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+
+import argparse
+import datetime as dt
+import hashlib
+import logging
+import json
+import os
+from os.path import dirname as up
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+
+import ijson
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    IO,
+    List
+)
+
+if up(up(__file__)) not in sys.path:
+    sys.path.append(up(up(__file__)))
+    from opportunity.utils import setup_logging
+
+from jsonToSQLite import (
+    Changes,
+    apply_categories,
+    apply_recipes,
+    create_tables,
+    current_schema,
+    delete_records,
+    ensure_tables,
+    finish,
+    load_hashes
+)
+from maxLevel import add_level
+from prepare_recipes import categorize
+from reduce import reduce_recipe
+
+class ObjectWriter:
+    """ Writes a JSON object one key at a time. """
+
+    def __init__(self, f: IO[str]) -> None:
+        self.f = f
+        self.first = True
+        self.f.write("{")
+
+    def write(self, key: str, value: Any) -> None:
+        self.f.write(("" if self.first else ", ") + json.dumps(key) +
+                     ": " + json.dumps(value))
+        self.first = False
+
+    def close(self) -> None:
+        self.f.write("}")
+
+class Timings:
+    """ Accumulates wall time per pipeline stage. """
+
+    def __init__(self) -> None:
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.last = time.perf_counter()
+
+    def tick(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.totals[stage] += now - self.last
+        self.last = now
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_manifest(output: str, recipes: Changes, categories: Changes,
+                   files: List[str]) -> Dict[str, Any]:
+    '''
+    Write manifest.json describing what this build changed
+
+    The running bot polls the manifest and reloads only the changed
+    files and the caches of changed categories.
+    '''
+    path = os.path.join(output, "manifest.json")
+    previous: Dict[str, Any] = {}
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    hashes = {name: file_hash(os.path.join(output, name)) for name in files}
+    manifest = {
+        "version": previous.get("version", 0) + 1,
+        "created": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "recipes": recipes.as_dict(),
+        "categories": categories.as_dict(),
+        "files": hashes,
+        "changed_files": [name for name, digest in hashes.items()
+                          if previous.get("files", {}).get(name) != digest]
+    }
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+def build(recipes_file: str, buildings_file: str, output: str,
+          full: bool = False, batch_size: int = 1000) -> Dict[str, float]:
+    '''
+    Build recipes.json (reduced), prepared.json, maxLevel.json and
+    opportunity.sqlite in output from a single pass over the inputs
+
+    Only the prepared categories, the level table, the record hashes and
+    one batch of database rows are held in memory. Unless full is set,
+    an existing database is updated in place: only records whose hash
+    changed are written and records missing from the input are deleted.
+    The changes are recorded in manifest.json.
+
+    Returns:
+        seconds spent per stage
+    '''
+    logger = logging.getLogger("build_data")
+    timings = Timings()
+    categories: Dict[str, Dict[str, Any]] = defaultdict(dict)
+    database = os.path.join(output, "opportunity.sqlite")
+    incremental = not full and os.path.isfile(database)
+    con = sqlite3.connect(database, isolation_level=None)
+    if incremental and not current_schema(con):
+        logger.info(f"{database} has an old schema, rebuilding it")
+        incremental = False
+    if incremental:
+        ensure_tables(con)
+    else:
+        create_tables(con)
+    old_recipes = load_hashes(con, "recipe")
+    old_categories = load_hashes(con, "category")
+    recipe_changes = Changes()
+    category_changes = Changes()
+    con.execute("BEGIN")
+    timings.tick("sqlite")
+
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    recipes_out = os.path.join(output, "recipes.json")
+    logger.info(f"streaming {recipes_file}...")
+    with open(recipes_file, "rb") as f, \
+            open(recipes_out + ".tmp", "w", encoding="utf-8") as out:
+        writer = ObjectWriter(out)
+        for key, recipe in ijson.kvitems(f, "", use_float=True):
+            timings.tick("parse")
+            reduced = reduce_recipe(recipe)
+            timings.tick("reduce")
+            writer.write(key, reduced)
+            timings.tick("write")
+            try:
+                if prepared := categorize(key, recipe):
+                    categories[prepared[0]].setdefault(key, prepared[1])
+            except KeyError as e:
+                logger.error(f"{key}: missing {e}")
+            timings.tick("prepare")
+            batch.append(reduced)
+            if len(batch) >= batch_size:
+                apply_recipes(con, batch, old_recipes, recipe_changes)
+                batch = []
+            timings.tick("sqlite")
+            count += 1
+        writer.close()
+        apply_recipes(con, batch, old_recipes, recipe_changes)
+        delete_records(con, "recipe", old_recipes, recipe_changes)
+        timings.tick("sqlite")
+    logger.info(f"processed {count} recipes")
+
+    maxLevel: Dict[str, Dict[str, str]] = {}
+    if buildings_file:
+        logger.info(f"streaming {buildings_file}...")
+        with open(buildings_file, "rb") as f:
+            for prefix, event, value in ijson.parse(f):
+                if prefix == "" and event == "map_key":
+                    timings.tick("parse")
+                    add_level(maxLevel, value)
+                    timings.tick("maxLevel")
+        timings.tick("parse")
+    else:
+        logger.warning("no building data given, skipping maxLevel.json")
+
+    apply_categories(con, categories.items(), old_categories,
+                     category_changes)
+    delete_records(con, "category", old_categories, category_changes)
+    finish(con)
+    con.close()
+    timings.tick("sqlite")
+    files = ["recipes.json", "prepared.json"]
+    os.replace(recipes_out + ".tmp", recipes_out)
+    with open(os.path.join(output, "prepared.json.tmp"), "w",
+              encoding="utf-8") as f:
+        json.dump(categories, f)
+    os.replace(os.path.join(output, "prepared.json.tmp"),
+               os.path.join(output, "prepared.json"))
+    if buildings_file:
+        files.append("maxLevel.json")
+        with open(os.path.join(output, "maxLevel.json.tmp"), "w",
+                  encoding="utf-8") as f:
+            json.dump(maxLevel, f)
+        os.replace(os.path.join(output, "maxLevel.json.tmp"),
+                   os.path.join(output, "maxLevel.json"))
+    timings.tick("write")
+    manifest = write_manifest(output, recipe_changes, category_changes, files)
+    timings.tick("manifest")
+    for kind, changes in (("recipes", recipe_changes),
+                          ("categories", category_changes)):
+        logger.info(f"{kind}: {len(changes.added)} added, " +
+                    f"{len(changes.updated)} updated, " +
+                    f"{len(changes.deleted)} deleted")
+    logger.info(f"manifest version {manifest['version']}, changed files: " +
+                f"{', '.join(manifest['changed_files']) or 'none'}")
+    return timings.totals
+
+def main(args, loglevel):
+    setup_logging(
+        "build_data",
+        log_path=os.path.join(up(up(__file__)), "logs", ".log"))
+    logger = logging.getLogger("build_data")
+    logger.setLevel(loglevel)
+
+    if not os.path.isdir(args.output):
+        logger.info(f"dir {args.output} does not exist. Creating...")
+        os.makedirs(args.output)
+    if os.path.abspath(args.recipes) == \
+            os.path.abspath(os.path.join(args.output, "recipes.json")):
+        logger.error("output folder would overwrite the input recipes.json")
+        return
+
+    start = time.perf_counter()
+    totals = build(args.recipes, args.buildings, args.output, args.full)
+    for stage, seconds in sorted(totals.items(), key=lambda t: -t[1]):
+        logger.info(f"{stage:>10}: {seconds:8.3f}s")
+    logger.info(f"{'total':>10}: {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Build all game data outputs in a single pass")
+
+    parser.add_argument(
+        "recipes",
+        help="recipes.json from the game data dump",
+        metavar="recipes")
+    parser.add_argument(
+        "-b",
+        "--buildings",
+        help="JSON file containing building data (for maxLevel.json)",
+        default="")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output folder",
+        default=".")
+    parser.add_argument(
+        "--full",
+        help="rebuild the database from scratch instead of updating it",
+        action="store_true")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="increase output verbosity",
+        action="store_true")
+    args = parser.parse_args()
+
+    loglevel = logging.DEBUG if args.verbose else logging.INFO
+
+    main(args, loglevel)
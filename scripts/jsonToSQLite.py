@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import argparse
+import hashlib
 import logging
 import json
 import os
@@ -13,12 +14,177 @@ import sqlite3
 from typing import (
     Any,
     Dict,
+    Iterable,
+    List,
+    Tuple
 )
 
 if up(up(__file__)) not in sys.path:
     sys.path.append(up(up(__file__)))
     from opportunity.utils import setup_logging
 
+def create_tables(con: sqlite3.Connection) -> None:
+    ''' Recreate the tables, the connection must be in autocommit mode '''
+    cur = con.cursor()
+    cur.execute("DROP TABLE IF EXISTS recipes")
+    cur.execute("DROP TABLE IF EXISTS prep")
+    cur.execute("DROP TABLE IF EXISTS recipe_inputs")
+    cur.execute("DROP TABLE IF EXISTS category_recipes")
+    cur.execute("DROP TABLE IF EXISTS record_hashes")
+    cur.execute("PRAGMA journal_mode=DELETE")  # page_size needs rollback
+    cur.execute("PRAGMA page_size=4096")
+    cur.execute("VACUUM")  # reduce file size to data size, apply page_size
+    cur.execute("PRAGMA synchronous=OFF")  # the file is rebuilt on failure
+
+    ensure_tables(con)
+
+def ensure_tables(con: sqlite3.Connection) -> None:
+    ''' Create missing tables, keeping existing data '''
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("CREATE TABLE IF NOT EXISTS recipes(id TEXT PRIMARY KEY, " +
+                "name TEXT, durationSeconds INT, inputs TEXT)")
+    create_category_tables(con)
+    con.execute("CREATE TABLE IF NOT EXISTS record_hashes(" +
+                "kind TEXT NOT NULL, key TEXT NOT NULL, hash TEXT NOT NULL, " +
+                "PRIMARY KEY(kind, key)) WITHOUT ROWID")
+
+def current_schema(con: sqlite3.Connection) -> bool:
+    '''
+    Whether the database can be updated in place. Databases from before
+    the record hashes keep recipes without a primary key, where
+    INSERT OR REPLACE would append duplicates instead of replacing.
+    '''
+    tables = {row[0] for row in con.execute(
+        "SELECT name FROM sqlite_master WHERE type='table'")}
+    if "record_hashes" not in tables:
+        return False
+    if "recipes" not in tables:
+        return True
+    return any(row[5] for row in con.execute("PRAGMA table_info(recipes)"))
+
+def create_category_tables(con: sqlite3.Connection) -> None:
+    ''' One row per recipe of a category and one per recipe input '''
+    con.execute("CREATE TABLE IF NOT EXISTS category_recipes(" +
+                "category TEXT NOT NULL, recipe_id TEXT NOT NULL, " +
+                "name TEXT, durationSeconds INT, " +
+                "PRIMARY KEY(category, recipe_id)) WITHOUT ROWID")
+    con.execute("CREATE TABLE IF NOT EXISTS recipe_inputs(" +
+                "category TEXT NOT NULL, recipe_id TEXT NOT NULL, " +
+                "position INT NOT NULL, item TEXT, quantity NUMERIC, " +
+                "item_match TEXT, " +
+                "PRIMARY KEY(category, recipe_id, position)) WITHOUT ROWID")
+
+def insert_recipes(con: sqlite3.Connection,
+                   recipes: Iterable[Dict[str, Any]]) -> None:
+    con.executemany("""INSERT OR REPLACE INTO recipes VALUES(?, ?, ?, ?)""",
+                    ((r["id"],
+                      r["name"],
+                      r["durationSeconds"],
+                      json.dumps(r["inputs"])) for r in recipes))
+
+def insert_categories(con: sqlite3.Connection,
+                      categories: Iterable[Tuple[str, Dict[str, Any]]]
+                      ) -> None:
+    ''' Insert prepared.json categories into the normalized tables '''
+    recipes = []
+    inputs = []
+    for category, category_recipes in categories:
+        for recipe_id, r in category_recipes.items():
+            recipes.append((category, recipe_id, r.get("name"),
+                            r.get("durationSeconds")))
+            for position, item in enumerate(r.get("inputs") or []):
+                if not isinstance(item, dict):
+                    continue
+                match = item.get("itemMatch") or [None]
+                inputs.append((category, recipe_id, position, match[0],
+                               item.get("quantity"), json.dumps(match)))
+    con.executemany("""INSERT OR REPLACE INTO category_recipes
+                       VALUES(?, ?, ?, ?)""", recipes)
+    con.executemany("""INSERT OR REPLACE INTO recipe_inputs
+                       VALUES(?, ?, ?, ?, ?, ?)""", inputs)
+
+def record_hash(record: Any) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True,
+                                   separators=(",", ":")).encode()).hexdigest()
+
+class Changes:
+    """ Keys added, updated and deleted by an incremental apply. """
+
+    def __init__(self) -> None:
+        self.added: List[str] = []
+        self.updated: List[str] = []
+        self.deleted: List[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.deleted)
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {"added": self.added, "updated": self.updated,
+                "deleted": self.deleted}
+
+def load_hashes(con: sqlite3.Connection, kind: str) -> Dict[str, str]:
+    return dict(con.execute("SELECT key, hash FROM record_hashes " +
+                            "WHERE kind=?", (kind,)))
+
+def _changed(records: Iterable[Tuple[str, Any]], old: Dict[str, str],
+             changes: Changes) -> List[Tuple[str, Any, str]]:
+    ''' Records whose hash differs, seen keys are removed from old '''
+    changed = []
+    for key, record in records:
+        digest = record_hash(record)
+        previous = old.pop(key, None)
+        if previous == digest:
+            continue
+        (changes.updated if previous else changes.added).append(key)
+        changed.append((key, record, digest))
+    return changed
+
+def _store_hashes(con: sqlite3.Connection, kind: str,
+                  changed: List[Tuple[str, Any, str]]) -> None:
+    con.executemany("INSERT OR REPLACE INTO record_hashes VALUES(?, ?, ?)",
+                    ((kind, key, digest) for key, _, digest in changed))
+
+def apply_recipes(con: sqlite3.Connection,
+                  recipes: Iterable[Dict[str, Any]], old: Dict[str, str],
+                  changes: Changes) -> None:
+    ''' Upsert the recipes whose content changed '''
+    changed = _changed(((r["id"], r) for r in recipes), old, changes)
+    insert_recipes(con, (r for _, r, _ in changed))
+    _store_hashes(con, "recipe", changed)
+
+def apply_categories(con: sqlite3.Connection,
+                     categories: Iterable[Tuple[str, Dict[str, Any]]],
+                     old: Dict[str, str], changes: Changes) -> None:
+    ''' Replace the rows of the categories whose content changed '''
+    changed = _changed(categories, old, changes)
+    _delete_category_rows(con, [key for key, _, _ in changed])
+    insert_categories(con, ((key, r) for key, r, _ in changed))
+    _store_hashes(con, "category", changed)
+
+def delete_records(con: sqlite3.Connection, kind: str,
+                   keys: Iterable[str], changes: Changes) -> None:
+    ''' Delete recipes or categories that are no longer in the data '''
+    keys = list(keys)
+    if kind == "recipe":
+        con.executemany("DELETE FROM recipes WHERE id=?",
+                        ((key,) for key in keys))
+    else:
+        _delete_category_rows(con, keys)
+    con.executemany("DELETE FROM record_hashes WHERE kind=? AND key=?",
+                    ((kind, key) for key in keys))
+    changes.deleted.extend(keys)
+
+def _delete_category_rows(con: sqlite3.Connection, keys: List[str]) -> None:
+    for table in ("category_recipes", "recipe_inputs"):
+        con.executemany(f"DELETE FROM {table} WHERE category=?",
+                        ((key,) for key in keys))
+
+def finish(con: sqlite3.Connection) -> None:
+    ''' Commit the load transaction and refresh the planner statistics '''
+    con.execute("COMMIT")
+    con.execute("ANALYZE")
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
 def main(args, loglevel):
     setup_logging(
         "jsonToSQLite",
@@ -28,16 +194,8 @@ def main(args, loglevel):
 
     con = sqlite3.connect("opportunity.sqlite", isolation_level=None)
     logger.info(f"Connected to opportunity.sqlite")
-
-    cur = con.cursor()
-    cur.execute("DROP TABLE IF EXISTS recipes")
-    cur.execute("DROP TABLE IF EXISTS prep")
-    cur.execute("VACUUM")  # reduce file size to data size
-
-    cur.execute("CREATE TABLE recipes(id TEXT, name TEXT, " +
-                "durationSeconds INT, inputs TEXT)")
-    cur.execute("CREATE TABLE prep(category TEXT, recipes TEXT)")
-    con.commit()
+    create_tables(con)
+    con.execute("BEGIN")
 
     j = {}
     file = os.path.join(args.data_folder, "recipes.json")
@@ -47,27 +205,17 @@ def main(args, loglevel):
             j = json.load(f)
         except Exception as e:
             logger.error(e)
-
-        for key in j:
-            r = j[key]
-            cur.execute("""INSERT INTO recipes VALUES(?, ?, ?, ?)""",
-                        (r["id"],
-                         r["name"],
-                         r["durationSeconds"],
-                         json.dumps(r["inputs"])))
+        apply_recipes(con, j.values(), {}, Changes())
     file = os.path.join(args.data_folder, "prepared.json")
     with open(file, "r", encoding="utf-8") as f:
         logger.info(f"reading {os.path.basename(file)}...")
         try:
-            j: Dict[str, Dict[str, Any]] = json.load(f)
+            j = json.load(f)
         except Exception as e:
             logger.error(e)
-        for key in j:
-            r = j[key]
-            cur.execute("""INSERT INTO prep VALUES(?, ?)""",
-                        (key, json.dumps(r)))
+        apply_categories(con, j.items(), {}, Changes())
 
-    con.commit()
+    finish(con)
     con.close()
 
 
@@ -18,6 +18,11 @@ if up(up(__file__)) not in sys.path:
     sys.path.append(up(up(__file__)))
     from opportunity.utils import setup_logging
 
+def add_level(maxLevel: Dict[str, Dict[str, str]], building: str) -> None:
+    ''' Record the rarity and level of a "name_R10" building key '''
+    name, rlvl = building.rsplit("_", 1)
+    maxLevel.setdefault(name, {})[rlvl[0]] = rlvl[1:]
+
 def main(args):
     setup_logging(
         "maxLevel",
@@ -33,9 +38,7 @@ def main(args):
             logger.error(e)
         maxLevel = defaultdict(dict)
         for building in j:
-            name = building.rsplit("_", 1)[0]
-            rlvl = building.rsplit("_", 1)[1]
-            maxLevel[name][rlvl[0]] = rlvl[1] if len(rlvl) == 2 else rlvl[1:]
+            add_level(maxLevel, building)
         if args.output:
             with open(args.output, "w", encoding="utf-8") as f:
                 logger.info(f"Writing {args.output}")
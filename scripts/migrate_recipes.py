@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+import json
+import os
+from os.path import dirname as up
+import sys
+import sqlite3
+
+if up(up(__file__)) not in sys.path:
+    sys.path.append(up(up(__file__)))
+    from opportunity.utils import setup_logging
+
+from jsonToSQLite import create_category_tables, insert_categories
+
+def main(args, loglevel):
+    setup_logging(
+        "migrate_recipes",
+        log_path=os.path.join(up(up(__file__)), "logs", ".log"))
+    logger = logging.getLogger("migrate_recipes")
+    logger.setLevel(loglevel)
+
+    with open(args.json, "r", encoding="utf-8") as f:
+        logger.info(f"reading {args.json}...")
+        categories = json.load(f)
+
+    con = sqlite3.connect(args.database, isolation_level=None)
+    logger.info(f"Connected to {args.database}")
+    con.execute("BEGIN")
+    con.execute("DROP TABLE IF EXISTS recipe_inputs")
+    con.execute("DROP TABLE IF EXISTS category_recipes")
+    create_category_tables(con)
+    insert_categories(con, categories.items())
+    con.execute("DROP TABLE IF EXISTS prep")
+    con.execute("COMMIT")
+    con.execute("ANALYZE")
+    count = con.execute("SELECT count(*) FROM category_recipes").fetchone()
+    logger.info(f"Migrated {count[0]} recipes of {len(categories)} " +
+                f"categories")
+    con.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Replace the prep table with normalized recipe tables")
+
+    parser.add_argument(
+        "json",
+        help="prepared.json to build the tables from",
+        metavar="json")
+    parser.add_argument(
+        "database",
+        help="SQLite database to migrate",
+        nargs="?",
+        default="opportunity.sqlite")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="increase output verbosity",
+        action="store_true")
+    args = parser.parse_args()
+
+    loglevel = logging.DEBUG if args.verbose else logging.INFO
+
+    main(args, loglevel)
@@ -13,12 +13,34 @@ from collections import defaultdict
 from typing import (
     Any,
     Dict,
+    Optional,
+    Tuple
 )
 
 if up(up(__file__)) not in sys.path:
     sys.path.append(up(up(__file__)))
     from opportunity.utils import setup_logging
 
+from reduce import reduce_recipe
+
+def categorize(key: str, recipe: Dict[str, Any]
+               ) -> Optional[Tuple[str, Dict[str, Any]]]:
+    '''
+    Return (category, prepared recipe) of a recipe, or None to drop it
+
+    Leveled recipes (C1-C10, Lv) and prepare/host/restore/tea recipes are
+    reduced, recipes without a suffix are kept whole.
+    '''
+    category = recipe["category"]
+    s = key.rsplit("_", 1)
+    if len(s) == 1:
+        return category, recipe
+    if re.match(r'C(10|[0-9])', s[-1]) or "Lv" in s[-1] or \
+            "prepare" in s[0] or "host" in s[0] or \
+            "restore" in s[0] or "tea" in s[0]:
+        return category, reduce_recipe(recipe)
+    return None
+
 def main(args):
     setup_logging(
         "prepare_recipes",
@@ -32,38 +54,13 @@ def main(args):
             j = json.load(f)
         except Exception as e:
             logger.error(e)
-        recipes = {}
-        categories = defaultdict(dict)
+        categories: Dict[str, Dict[str, Any]] = defaultdict(dict)
         for recipe in j:
-            if len(recipe.rsplit("_", 1)) > 1:
-                s = recipe.rsplit("_", 1)
-                try:
-                    if re.match(r'C(10|[0-9])', s[len(s)-1]):
-                        if recipe not in categories[j[recipe]["category"]]:
-                            categories.setdefault(j[recipe]["category"], {})
-                            category = j[recipe]["category"]
-                            r = {k: v for k, v in j[recipe].items() if k in
-                                 ["id", "name", "durationSeconds",
-                                  "requirements", "inputs"]}
-                            categories[category][recipe] = r
-                    if "Lv" in s[len(s)-1] or \
-                            "prepare" in s[0] or \
-                            "host" in s[0] or \
-                            "restore" in s[0] or \
-                            "tea" in s[0]:
-                        if recipe not in categories[j[recipe]["category"]]:
-                            category = j[recipe]["category"]
-                            categories.setdefault(j[recipe]["category"], {})
-                            a = j[recipe]
-                            r = {k: v for k, v in j[recipe].items() if k in
-                                 ["id", "name", "durationSeconds",
-                                  "requirements", "inputs"]}
-                            categories[category][recipe] = r
-                except Exception as e:
-                    logger.error(e)
-            else:
-                categories.setdefault(j[recipe]["category"], {})
-                categories[j[recipe]["category"]][recipe] = j[recipe]
+            try:
+                if prepared := categorize(recipe, j[recipe]):
+                    categories[prepared[0]].setdefault(recipe, prepared[1])
+            except Exception as e:
+                logger.error(e)
         if args.output:
             with open(args.output, "w", encoding="utf-8") as f:
                 logger.info(f"Writing {args.output}")
@@ -17,6 +17,12 @@ if up(up(__file__)) not in sys.path:
     sys.path.append(up(up(__file__)))
     from opportunity.utils import setup_logging
 
+KEEP = ["id", "name", "durationSeconds", "requirements", "inputs"]
+
+def reduce_recipe(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    ''' Keep only the attributes of a recipe the bot uses '''
+    return {k: v for k, v in recipe.items() if k in KEEP}
+
 def main(args):
     setup_logging(
         "reduce",
@@ -31,10 +37,7 @@ def main(args):
         except Exception as e:
             logger.error(e)
         for key in list(j.keys()):
-            for attr in list(j[key]):
-                if attr not in ["id", "name", "durationSeconds",
-                                "requirements", "inputs"]:
-                    del j[key][attr]
+            j[key] = reduce_recipe(j[key])
         if args.output:
             with open(args.output, "w", encoding="utf-8") as f:
                 logger.info(f"Writing {args.output}")
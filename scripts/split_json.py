@@ -5,29 +5,127 @@ import logging
 import json
 import os
 from os.path import dirname as up
+import sys
+import zlib
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait
+)
 
-def main(args):
+import ijson
+
+# Annotation imports
+from typing import (
+    Any,
+    Dict,
+    Set,
+    Tuple
+)
+
+if up(up(__file__)) not in sys.path:
+    sys.path.append(up(up(__file__)))
+    from opportunity.utils import setup_logging
+
+PACK = "categories.pack"
+INDEX = "categories.index.json"
+
+def write_category(path: str, value: Any) -> str:
+    ''' Write value to path through a temporary file '''
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(path + ".tmp", path)
+    return path
+
+def encode_category(category: str, value: Any) -> Tuple[str, bytes]:
+    ''' zlib compressed compact JSON, the pack encoding of a category '''
+    return category, zlib.compress(
+        json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+def read_category(folder: str, category: str) -> Any:
+    ''' Read one category from a pack without reading the others '''
+    with open(os.path.join(folder, INDEX), "r", encoding="utf-8") as f:
+        offset, size = json.load(f)[category]
+    with open(os.path.join(folder, PACK), "rb") as f:
+        f.seek(offset)
+        return json.loads(zlib.decompress(f.read(size)))
+
+def split(json_file: str, output: str, workers: int = 8,
+          pack: bool = False) -> int:
+    '''
+    Write every top-level key of json_file to output
+
+    Categories are streamed from the input and encoded and written by a
+    pool of workers, with at most twice as many categories in flight as
+    there are workers. Without pack every category is written to
+    <category>.json, otherwise all categories are appended to one pack
+    file and their offsets and sizes are written to an index file.
+
+    Returns:
+        number of categories written
+    '''
     logger = logging.getLogger("split_json")
+    pending: Set[Future] = set()
+    index: Dict[str, Tuple[int, int]] = {}
+    count = 0
+    packed = open(os.path.join(output, PACK + ".tmp"), "wb") if pack \
+        else None
 
-    j = {}
-    with open(args.json, "r", encoding="utf-8") as f:
-        logger.info(f"reading {args.json}...")
+    def collect(done: Set[Future]) -> None:
+        nonlocal count
+        for future in done:
+            result = future.result()
+            if packed:
+                result, data = result
+                index[result] = (packed.tell(), len(data))
+                packed.write(data)
+            logger.debug(f"Successfully written {result}.")
+            count += 1
+
+    with open(json_file, "rb") as f, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        logger.info(f"streaming {json_file}...")
+        for category, value in ijson.kvitems(f, "", use_float=True):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            if packed:
+                pending.add(pool.submit(encode_category, category, value))
+            else:
+                path = os.path.join(output, category + ".json")
+                pending.add(pool.submit(write_category, path, value))
+        collect(wait(pending)[0])
+
+    if packed:
+        packed.close()
+        os.replace(os.path.join(output, PACK + ".tmp"),
+                   os.path.join(output, PACK))
+        write_category(os.path.join(output, INDEX), index)
+        logger.info(f"Packed {count} categories into " +
+                    f"{os.path.join(output, PACK)}")
+    return count
+
+def main(args, loglevel):
+    setup_logging(
+        "split_json",
+        log_path=os.path.join(up(up(__file__)), "logs", ".log"))
+    logger = logging.getLogger("split_json")
+    logger.setLevel(loglevel)
+
+    if args.output and not os.path.isdir(args.output):
+        logger.info(f"dir {args.output} does not exist. Creating...")
         try:
-            j = json.load(f)
-        except Exception as e:
+            os.makedirs(args.output)
+        except OSError as e:
             logger.error(e)
-        if args.output and not os.path.isdir(args.output):
-            logger.info(f"dir {args.output} does not exist. Creating...")
-            try:
-                os.mkdir(args.output)
-            except OSError as e:
-                logger.error(e)
-        for category in j.keys():
-            path = os.path.join(args.output, category+".json")
-            logger.info(f"Writing {category+'.json'}, path: {path}...")
-            with open(path, "w", encoding="utf-8") as x:
-                json.dump(j[category], x)
-            logger.info(f"Successfully written {path}.")
+            return
+    try:
+        count = split(args.json, args.output, args.workers, args.pack)
+    except (OSError, ijson.JSONError) as e:
+        logger.error(e)
+        return
+    logger.info(f"Successfully written {count} categories.")
 
 
 if __name__ == '__main__':
@@ -47,6 +145,18 @@ if __name__ == '__main__':
         "--output",
         help="output folder",
         default="")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="number of writer threads",
+        type=int,
+        default=8)
+    parser.add_argument(
+        "--pack",
+        help=f"write one {PACK} and {INDEX} instead of a file per key",
+        action="store_true")
     args = parser.parse_args()
 
-    main(args)
+    loglevel = logging.DEBUG if args.verbose else logging.INFO
+
+    main(args, loglevel)